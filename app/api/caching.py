@@ -0,0 +1,78 @@
+import hashlib
+import json
+from typing import Awaitable, Callable, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from app.core.cache import api_cache, catalog_version_name
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cached_json_response(
+    request: Request,
+    endpoint: str,
+    region: Optional[str],
+    params: dict,
+    build: Callable[[], Tuple[object, dict]],
+    version_name: Optional[str] = None,
+) -> Response:
+    """
+    Serves a JSON response from the API cache, building it with `build` on a miss.
+
+    `build` returns (content, extra_headers). Entries are keyed on the normalized query
+    params plus the version of the data set they were built from (`version_name`,
+    by default the region's catalog), so a version bump invalidates them. The
+    response carries an ETag and a matching If-None-Match gets a 304 without a body.
+    """
+    version = api_cache.get_version(version_name or catalog_version_name(region))
+    cache_params = {**params, "catalog_version": version}
+
+    entry = api_cache.get(endpoint, params=cache_params, region=region)
+    if entry is None:
+        entry = _build_entry(*build())
+        api_cache.set(endpoint, entry, params=cache_params, region=region)
+    return _entry_response(request, entry)
+
+
+async def cached_json_response_async(
+    request: Request,
+    endpoint: str,
+    region: Optional[str],
+    params: dict,
+    build: Callable[[], Awaitable[Tuple[object, dict]]],
+    version_name: Optional[str] = None,
+) -> Response:
+    """
+    Same as cached_json_response for async endpoints: `build` is awaited and the
+    (blocking) Redis calls run in the threadpool, off the event loop.
+    """
+    if not api_cache.enabled:
+        return _entry_response(request, _build_entry(*(await build())))
+
+    version = await run_in_threadpool(api_cache.get_version, version_name or catalog_version_name(region))
+    cache_params = {**params, "catalog_version": version}
+
+    entry = await run_in_threadpool(api_cache.get, endpoint, params=cache_params, region=region)
+    if entry is None:
+        entry = _build_entry(*(await build()))
+        await run_in_threadpool(api_cache.set, endpoint, entry, params=cache_params, region=region)
+    return _entry_response(request, entry)
+
+
+def _build_entry(content, extra_headers: dict) -> dict:
+    body = json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":"))
+    etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+    return {"body": body, "etag": etag, "headers": extra_headers}
+
+
+def _entry_response(request: Request, entry: dict) -> Response:
+    headers = {"ETag": entry["etag"], **entry["headers"]}
+    if _etag_matches(request.headers.get("if-none-match"), entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
@@ -1,3 +1,4 @@
+from app.database.async_session import AsyncSessionLocal
 from app.database.session import SessionLocal
 
 def get_db():
@@ -7,3 +8,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Dependência do FastAPI para obter uma sessão assíncrona, para os endpoints async."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,66 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.api.caching import cached_json_response_async
+from app.core.cache import trends_version_name
+from app.crud import async_crud_trends, crud_trend_scores
+from app.schemas import trend as trend_schema
+from app.database.models import RegionEnum
+
+router = APIRouter()
+
+@router.get("", response_model=List[trend_schema.RankedTrend])
+async def read_ranked_trends(
+    request: Request,
+    region: RegionEnum,
+    db: AsyncSession = Depends(deps.get_async_db),
+    category: str = crud_trend_scores.ALL_CATEGORIES,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Recupera o ranking de tendências de uma região, geral ou de uma categoria.
+    O ranking é pré-calculado após cada ingestão; a leitura é uma única consulta.
+    """
+    async def build():
+        rankings = await async_crud_trends.get_trend_rankings(
+            db, region=region.value, category=category, skip=skip, limit=limit
+        )
+        return [trend_schema.RankedTrend.model_validate(r, from_attributes=True) for r in rankings], {}
+
+    params = {"category": category, "skip": skip, "limit": limit}
+    return await cached_json_response_async(
+        request, "trend_rankings", region=region.value, params=params, build=build,
+        version_name=trends_version_name(),
+    )
+
+
+@router.get("/{trend_id}", response_model=trend_schema.TrendDetail)
+async def read_trend(
+    request: Request,
+    trend_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    products_skip: int = Query(0, ge=0),
+    products_limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Recupera uma tendência com seus produtos mais relevantes, paginados.
+    """
+    async def build():
+        trend = await async_crud_trends.get_trend(db, trend_id=trend_id)
+        if not trend:
+            raise HTTPException(status_code=404, detail="Trend not found")
+        products = await async_crud_trends.get_trend_products(db, trend_id=trend_id, skip=products_skip, limit=products_limit)
+        detail = trend_schema.Trend.model_validate(trend, from_attributes=True).model_dump()
+        return trend_schema.TrendDetail(
+            **detail,
+            products=[trend_schema.ProductListItem.model_validate(p, from_attributes=True) for p in products],
+        ), {}
+
+    params = {"trend_id": trend_id, "products_skip": products_skip, "products_limit": products_limit}
+    return await cached_json_response_async(
+        request, "trend_detail", region=None, params=params, build=build,
+        version_name=trends_version_name(),
+    )
@@ -1,51 +1,172 @@
 from typing import List
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api import deps
-from app.crud import crud_trends as crud_catalog
+from app.api import deps, export
+from app.api.caching import cached_json_response_async
+from app.core.config import settings
+from app.database.session import SessionLocal
+from app.crud import async_crud_trends, crud_trends as crud_catalog
 from app.schemas import trend as catalog_schema
 from app.database.models import RegionEnum
 
 router = APIRouter()
 
 @router.get("/filters", response_model=List[catalog_schema.Filter])
-def read_filters(
+async def read_filters(
+    request: Request,
     category: str,
     region: RegionEnum,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
 ):
     """
     Recupera uma lista de filtros para uma determinada categoria e região.
     """
-    # This logic is simplified. We might need a more robust way to link
-    # a category to a search_query. For now, we assume a direct match.
-    search_query = crud_catalog.get_search_query_by_name_and_region(db, query=category, region=region.value)
-    if not search_query:
-        return []
-    return crud_catalog.get_filters_by_query_id(db, search_query_id=search_query.id)
+    async def build():
+        # This logic is simplified. We might need a more robust way to link
+        # a category to a search_query. For now, we assume a direct match.
+        search_query = await async_crud_trends.get_search_query_by_name_and_region(db, query=category, region=region.value)
+        if not search_query:
+            return [], {}
+        filters = await async_crud_trends.get_filters_by_query_id(db, search_query_id=search_query.id)
+        return [catalog_schema.Filter.model_validate(f, from_attributes=True) for f in filters], {}
+
+    return await cached_json_response_async(
+        request, "catalog_filters", region=region.value, params={"category": category}, build=build
+    )
 
 
-@router.get("/products", response_model=List[catalog_schema.Product])
-def read_products(
+@router.get("/products", response_model=List[catalog_schema.ProductListItem])
+async def read_products(
+    request: Request,
     region: RegionEnum,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     category: str = None,
     brand: str = None,
     price_max: float = None,
+    sort: str = Query("updated_at", pattern="^(updated_at|price)$"),
+    cursor: str = None,
+    fields: str = Query(None, description="Colunas separadas por vírgula (padrão: as da listagem, sem os JSON)"),
     skip: int = 0,
     limit: int = 100,
 ):
     """
     Recupera uma lista de produtos do catálogo, com filtros.
+    Quando há mais resultados, o cabeçalho X-Next-Cursor traz o cursor da próxima página.
+
+    Por padrão carrega só as colunas da listagem; variants e other_details ficam para
+    o detalhe do produto ou podem ser pedidos em `fields`.
+    """
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    async def build():
+        try:
+            products = await async_crud_trends.get_products_by_region(
+                db,
+                region=region.value,
+                category=category,
+                brand=brand,
+                price_max=price_max,
+                sort=sort,
+                cursor=cursor,
+                fields=selected or crud_catalog.PRODUCT_LIST_FIELDS,
+                skip=skip,
+                limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        headers = {}
+        if products and len(products) == limit:
+            headers["X-Next-Cursor"] = crud_catalog.encode_product_cursor(products[-1], sort=sort)
+        if selected:
+            return [{field: getattr(p, field) for field in dict.fromkeys(["id", *selected])} for p in products], headers
+        return [catalog_schema.ProductListItem.model_validate(p, from_attributes=True) for p in products], headers
+
+    params = {
+        "category": category,
+        "brand": brand,
+        "price_max": price_max,
+        "sort": sort,
+        "cursor": cursor,
+        "fields": ",".join(selected) if selected else None,
+        "skip": skip,
+        "limit": limit,
+    }
+    return await cached_json_response_async(request, "catalog_products", region=region.value, params=params, build=build)
+
+
+@router.get("/products/{product_id}", response_model=catalog_schema.Product)
+async def read_product(product_id: int, db: AsyncSession = Depends(deps.get_async_db)):
     """
-    products = crud_catalog.get_products_by_region(
-        db,
-        region=region.value,
-        category=category,
-        brand=brand,
-        price_max=price_max,
-        skip=skip,
-        limit=limit
+    Recupera um produto com todas as colunas, incluindo variants e other_details.
+    """
+    product = await async_crud_trends.get_product(db, product_id=product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+
+@router.get("/search", response_model=List[catalog_schema.ProductListItem])
+async def search_products(
+    request: Request,
+    region: RegionEnum,
+    q: str = Query(..., min_length=2, max_length=200),
+    db: AsyncSession = Depends(deps.get_async_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Busca textual no catálogo (título, marca, loja e filtros), no idioma da região,
+    com os resultados mais relevantes primeiro.
+    """
+    async def build():
+        products = await async_crud_trends.search_products(db, region=region.value, query=q, skip=skip, limit=limit)
+        return [catalog_schema.ProductListItem.model_validate(p, from_attributes=True) for p in products], {}
+
+    params = {"q": q, "skip": skip, "limit": limit}
+    return await cached_json_response_async(request, "catalog_search", region=region.value, params=params, build=build)
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+@router.get("/export")
+def export_products(
+    region: RegionEnum,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    columns: str = Query(None, description="Colunas separadas por vírgula (padrão: todas)"),
+):
+    """
+    Exporta todos os produtos da região em uma única resposta, em NDJSON ou CSV.
+
+    As linhas são lidas do banco em lotes por um cursor no servidor e escritas no
+    corpo à medida que chegam, sem montar objetos ORM nem Pydantic, de forma que o
+    uso de memória não depende do tamanho do catálogo.
+    """
+    selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else list(crud_catalog.EXPORT_COLUMNS)
+    unknown = [c for c in selected if c not in crud_catalog.EXPORT_COLUMNS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown columns: {', '.join(unknown)}. Available: {', '.join(crud_catalog.EXPORT_COLUMNS)}",
+        )
+
+    def stream():
+        # A sessão é da resposta, e não da requisição: vive enquanto o corpo é enviado
+        db = SessionLocal()
+        try:
+            rows = crud_catalog.iter_product_rows(
+                db, region=region.value, columns=selected, batch_size=settings.CATALOG_EXPORT_BATCH_SIZE
+            )
+            serialize = export.csv_chunks if format == "csv" else export.ndjson_chunks
+            yield from serialize(selected, rows)
+        finally:
+            db.close()
+
+    filename = f"catalog-{region.value}.{format}"
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
-    return products
\ No newline at end of file
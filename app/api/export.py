@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Iterable, Iterator, Sequence
+
+# Linhas serializadas por chunk enviado ao cliente
+ROWS_PER_CHUNK = 500
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Um único encoder reaproveitado (usa o encoder em C), em vez de um json.dumps por linha
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def _chunks(rows: Iterable[Sequence]) -> Iterator[list]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, ROWS_PER_CHUNK))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ndjson_chunks(columns: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """Serializa tuplas de linha como NDJSON, um objeto por linha, em chunks de bytes."""
+    for chunk in _chunks(rows):
+        yield "".join(_encoder.encode(dict(zip(columns, row))) + "\n" for row in chunk).encode("utf-8")
+
+
+def csv_chunks(columns: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """
+    Serializa tuplas de linha como CSV com cabeçalho, em chunks de bytes. Colunas JSON
+    (variants, other_details) viram texto JSON na célula.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(rows):
+        writer.writerows(
+            [
+                _encoder.encode(value) if isinstance(value, (dict, list)) else value
+                for value in row
+            ]
+            for row in chunk
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+import redis
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+
+# Parameters whose values are case-insensitive for the upstream APIs
+CASE_INSENSITIVE_PARAMS = {"q"}
+
+# Tempo que o cache espera antes de tentar o Redis novamente após uma falha
+REDIS_RETRY_SECONDS = 30
+
+
+def normalize_params(params: Optional[dict]) -> str:
+    """
+    Returns a canonical representation of request parameters:
+    sorted keys, no empty values and collapsed whitespace.
+    """
+    normalized = {}
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split())
+            if key in CASE_INSENSITIVE_PARAMS:
+                value = value.casefold()
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def catalog_version_name(region: str) -> str:
+    """Name of the version key bumped when a region's catalog changes."""
+    return f"catalog:{region.upper()}"
+
+
+def trends_version_name() -> str:
+    """Name of the version key bumped when trend rankings or trend products change."""
+    return "trends"
+
+
+class LRUCache:
+    """
+    In-process LRU cache with per-entry expiry. Thread-safe.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ResponseCache:
+    """
+    Cache for external API responses, keyed on (endpoint, normalized params, region).
+
+    Entries live in Redis with a per-endpoint TTL and the number of entries is bounded
+    by evicting the oldest ones. When Redis is unreachable the cache falls back to an
+    in-process LRU.
+    """
+    def __init__(
+        self,
+        namespace: str = "respcache",
+        redis_url: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        local_max_entries: Optional[int] = None,
+        ttls: Optional[dict] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.namespace = namespace
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttls = ttls if ttls is not None else settings.RESPONSE_CACHE_TTLS
+        self.enabled = settings.RESPONSE_CACHE_ENABLED if enabled is None else enabled
+        self.local = LRUCache(local_max_entries or settings.RESPONSE_CACHE_LOCAL_MAX_ENTRIES)
+        self._redis = None
+        self._redis_down_until = 0.0
+        self._local_versions = {}
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def index_key(self) -> str:
+        return f"{self.namespace}:index"
+
+    def make_key(self, endpoint: str, params: Optional[dict] = None, region: Optional[str] = None) -> str:
+        digest = hashlib.sha1(normalize_params(params).encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{endpoint}:{(region or '-').upper()}:{digest}"
+
+    def ttl_for(self, endpoint: str) -> int:
+        return self.ttls.get(endpoint, settings.RESPONSE_CACHE_DEFAULT_TTL_SECONDS)
+
+    def _get_redis(self):
+        if time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+        return self._redis
+
+    def _mark_redis_down(self, error: Exception):
+        print(f"Response cache: Redis unavailable, using the in-process cache for {REDIS_RETRY_SECONDS}s ({error})")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _count(self, endpoint: str, outcome: str):
+        with self._stats_lock:
+            counters = self._stats.setdefault(endpoint, {"hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def get(self, endpoint: str, params: Optional[dict] = None, region: Optional[str] = None) -> Optional[Any]:
+        """Returns the cached value or None."""
+        if not self.enabled:
+            return None
+        key = self.make_key(endpoint, params, region)
+        raw = None
+        client = self._get_redis()
+        if client is not None:
+            try:
+                raw = client.get(key)
+            except redis.RedisError as e:
+                self._mark_redis_down(e)
+        if raw is None:
+            raw = self.local.get(key)
+
+        self._count(endpoint, "misses" if raw is None else "hits")
+        return None if raw is None else json.loads(raw)
+
+    def set(self, endpoint: str, value: Any, params: Optional[dict] = None, region: Optional[str] = None):
+        """Stores a JSON-serializable value with the endpoint's TTL."""
+        if not self.enabled:
+            return
+        key = self.make_key(endpoint, params, region)
+        ttl = self.ttl_for(endpoint)
+        raw = json.dumps(value, ensure_ascii=False, default=str)
+        client = self._get_redis()
+        if client is None:
+            self.local.set(key, raw, ttl)
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.set(key, raw, ex=ttl)
+            pipe.zadd(self.index_key, {key: time.time()})
+            pipe.zcard(self.index_key)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                self._evict(client, size - self.max_entries)
+        except redis.RedisError as e:
+            self._mark_redis_down(e)
+            self.local.set(key, raw, ttl)
+
+    async def get_async(self, endpoint: str, params: Optional[dict] = None, region: Optional[str] = None) -> Optional[Any]:
+        """Async version of get: the Redis round trip runs in a thread instead of blocking the event loop."""
+        if not self.enabled:
+            return None
+        return await run_in_threadpool(self.get, endpoint, params=params, region=region)
+
+    async def set_async(self, endpoint: str, value: Any, params: Optional[dict] = None, region: Optional[str] = None):
+        """Async version of set."""
+        if not self.enabled:
+            return
+        await run_in_threadpool(self.set, endpoint, value, params=params, region=region)
+
+    def _evict(self, client, count: int):
+        """Removes the `count` oldest entries from Redis."""
+        oldest = client.zrange(self.index_key, 0, count - 1)
+        if not oldest:
+            return
+        pipe = client.pipeline(transaction=False)
+        pipe.delete(*oldest)
+        pipe.zrem(self.index_key, *oldest)
+        pipe.execute()
+
+    def get_version(self, name: str) -> int:
+        """
+        Returns the current version of a named data set. Including it in the cached
+        params lets a single bump_version invalidate every entry built from that data.
+        """
+        client = self._get_redis()
+        if client is not None:
+            try:
+                return int(client.get(f"{self.namespace}:version:{name}") or 0)
+            except redis.RedisError as e:
+                self._mark_redis_down(e)
+        return self._local_versions.get(name, 0)
+
+    def bump_version(self, name: str) -> int:
+        """Increments the version of a named data set and returns the new value."""
+        self._local_versions[name] = self._local_versions.get(name, 0) + 1
+        client = self._get_redis()
+        if client is not None:
+            try:
+                return client.incr(f"{self.namespace}:version:{name}")
+            except redis.RedisError as e:
+                self._mark_redis_down(e)
+        return self._local_versions[name]
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters per endpoint for this process."""
+        with self._stats_lock:
+            return {endpoint: dict(counters) for endpoint, counters in self._stats.items()}
+
+
+response_cache = ResponseCache()
+
+# Cache das respostas da própria API (catálogo), invalidado por versão de região
+api_cache = ResponseCache(namespace="apicache")
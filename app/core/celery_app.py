@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_process_init
 from app.core.config import settings
 
 # Cria a instância do Celery
@@ -17,3 +18,13 @@ celery_app.conf.update(
     task_track_started=True,
     # Outras configurações podem ser adicionadas aqui
 )
+
+
+@worker_process_init.connect
+def reset_database_pool(**kwargs):
+    """
+    Cada processo filho do worker começa com um pool vazio, sem herdar conexões
+    abertas pelo processo pai antes do fork.
+    """
+    from app.database.session import engine
+    engine.dispose(close=False)
@@ -1,4 +1,5 @@
 import os
+from typing import Any, Dict, List, Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -11,10 +12,102 @@ class Settings(BaseSettings):
     """
     DATABASE_URL: str
     HASDATA_API_KEY: str
+    SERPER_API_KEY: str = ""
     REDIS_URL: str = "redis://localhost:6379/0"
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
 
+    # Banco assíncrono da API (asyncpg); vazio deriva de DATABASE_URL
+    ASYNC_DATABASE_URL: str = ""
+    # Pool de conexões por processo: perfil 'web' (API) ou 'worker' (Celery).
+    # pool_size 0 desliga o pool (NullPool). pre_ping: 'always' (ping a cada checkout),
+    # 'idle' (só em conexões paradas há mais de ping_idle_seconds) ou 'never'
+    DATABASE_POOL_PROFILE: str = "web"
+    DATABASE_POOL_PROFILES: Dict[str, Dict[str, Any]] = {
+        "web": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": 1800,
+                "pre_ping": "idle", "ping_idle_seconds": 30},
+        # Uma tarefa por vez em cada processo filho do Celery
+        "worker": {"pool_size": 1, "max_overflow": 1, "pool_timeout": 60, "pool_recycle": 600,
+                   "pre_ping": "idle", "ping_idle_seconds": 30},
+        # Engine síncrona da API: só marcas, lojas e a exportação do catálogo
+        "web_sync": {"pool_size": 1, "max_overflow": 2, "pool_timeout": 30, "pool_recycle": 1800,
+                     "pre_ping": "idle", "ping_idle_seconds": 30},
+    }
+    # Perfil da engine síncrona para cada perfil de processo (os ausentes usam o próprio perfil).
+    # Conexões por processo: web = async 5+10 + sync 1+2 = até 18 (x4 com gunicorn -w 4 = 72);
+    # worker = 1+1 por processo filho do Celery
+    DATABASE_SYNC_POOL_PROFILES: Dict[str, str] = {"web": "web_sync"}
+    # Sobrescrevem o perfil ativo (DATABASE_POOL_PROFILE) quando definidos
+    DATABASE_POOL_SIZE: Optional[int] = None
+    DATABASE_MAX_OVERFLOW: Optional[int] = None
+    # Pooler em modo transação (PgBouncer, Supabase na porta 6543): desliga prepared statements
+    DATABASE_TRANSACTION_POOLER: bool = False
+
+    # Cliente HTTP da Hasdata
+    HASDATA_API_URL: str = "https://api.hasdata.com/scrape/google"
+    HASDATA_MAX_IN_FLIGHT: int = 10
+    HASDATA_TIMEOUT_SECONDS: float = 30.0
+    HASDATA_KEEPALIVE_SECONDS: float = 30.0
+
+    # Limite de requisições por provedor (req/s) e tamanho do burst, compartilhados pelos workers
+    RATE_LIMITS: Dict[str, float] = {
+        "hasdata": 10.0,
+        "serper": 5.0,
+        "google_trends": 0.2,
+    }
+    RATE_LIMIT_BURSTS: Dict[str, float] = {}
+    RATE_LIMIT_MAX_WAIT_SECONDS: float = 30.0
+
+    # Retentativas das tarefas do Celery (backoff exponencial com jitter)
+    RETRY_MAX_ATTEMPTS: int = 5
+    RETRY_BACKOFF_BASE_SECONDS: float = 2.0
+    RETRY_BACKOFF_MAX_SECONDS: float = 300.0
+
+    # Sincronização do catálogo
+    CATALOG_SYNC_DETAILS_BATCH_SIZE: int = 20
+    CATALOG_SYNC_QUERIES_PER_TASK: int = 5
+    CATALOG_SYNC_PRUNE_FILTERS: bool = False
+    CATALOG_SYNC_SKIP_UNCHANGED: bool = True
+    # Linhas lidas do cursor do banco por vez na exportação do catálogo
+    CATALOG_EXPORT_BATCH_SIZE: int = 2000
+
+    # Processamento e enriquecimento de tendências
+    TREND_PROCESSOR_BATCH_SIZE: int = 500
+    TREND_ENRICHMENT_WINDOW_HOURS: int = 24
+    # Agrupamento de tendências quase duplicadas (MinHash + LSH sobre trigramas)
+    TREND_DEDUP_ENABLED: bool = True
+    TREND_DEDUP_SIMILARITY: float = 0.7
+    TREND_DEDUP_MINHASH_PERMUTATIONS: int = 64
+    TREND_DEDUP_LSH_BANDS: int = 16
+    # Pontuação das tendências: soma das observações com meia-vida, e tamanho do top-N
+    TREND_SCORE_HALF_LIFE_HOURS: float = 24.0
+    TREND_SCORE_SOURCE_WEIGHTS: Dict[str, float] = {}
+    # Valor de uma observação quando a fonte não informa pontuação (Shein, TikTok)
+    TREND_SCORE_DEFAULT_OBSERVATION: float = 50.0
+    TREND_RANKING_SIZE: int = 100
+    BRAND_MATCHER_REFRESH_SECONDS: int = 300
+    LOOKUP_CACHE_MAX_ENTRIES: int = 10000
+    LOOKUP_CACHE_TTL_SECONDS: int = 3600
+    # Marcas removidas das descrições da Shein; vazio usa a lista padrão do coletor
+    SHEIN_BRANDS_TO_REMOVE: List[str] = []
+
+    # Cache das respostas das APIs externas (TTL em segundos por endpoint)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 50000
+    RESPONSE_CACHE_LOCAL_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_DEFAULT_TTL_SECONDS: int = 3600
+    RESPONSE_CACHE_TTLS: Dict[str, int] = {
+        "hasdata_shopping": 6 * 3600,
+        "hasdata_immersive_product": 24 * 3600,
+        "serper_shopping": 12 * 3600,
+        "catalog_products": 3600,
+        "catalog_filters": 3600,
+        "catalog_search": 3600,
+        "trend_rankings": 3600,
+        # Os produtos da tendência vêm do catálogo, cujo sync não invalida este cache
+        "trend_detail": 900,
+    }
+
     class Config:
         # O .env tem prioridade sobre as variáveis de ambiente do sistema
         env_file = ".env"
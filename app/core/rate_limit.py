@@ -0,0 +1,163 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+import redis
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+
+"""
+Limite de requisições por provedor (Hasdata, Serper, Google Trends) compartilhado
+por todos os workers, e backoff exponencial com jitter para as retentativas.
+"""
+
+
+class RateLimitedError(Exception):
+    """O provedor recusou a chamada por limite de taxa (HTTP 429) ou o limite local se esgotou."""
+    def __init__(self, provider: str, retry_after: Optional[float] = None):
+        self.provider = provider
+        self.retry_after = retry_after
+        message = f"Rate limited by {provider}"
+        if retry_after:
+            message += f" (retry after {retry_after:.1f}s)"
+        super().__init__(message)
+
+
+class ProviderUnavailableError(Exception):
+    """Erro temporário do provedor (5xx, timeout, falha de conexão) que vale a pena retentar."""
+    def __init__(self, provider: str, detail: str = ""):
+        self.provider = provider
+        super().__init__(f"{provider} unavailable: {detail}")
+
+
+# Token bucket atômico: devolve 0 quando consumiu os tokens pedidos, ou o tempo de espera em
+# segundos. O tempo vem do relógio do Redis, e não dos workers, cujos relógios podem divergir.
+TOKEN_BUCKET_SCRIPT = """
+redis.replicate_commands()
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+# Tempo que o limitador espera antes de tentar o Redis novamente após uma falha
+REDIS_RETRY_SECONDS = 30
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket por provedor guardado no Redis, de modo que o limite vale para o
+    conjunto dos workers. Se o Redis estiver indisponível, cada processo usa um
+    bucket local com a mesma taxa.
+    """
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self._redis = None
+        self._script = None
+        self._redis_down_until = 0.0
+        self._local = {}
+        self._lock = threading.Lock()
+
+    def _limits(self, provider: str, tokens: int = 1):
+        rate = settings.RATE_LIMITS.get(provider)
+        if not rate:
+            return None, None
+        capacity = settings.RATE_LIMIT_BURSTS.get(provider, max(1.0, rate))
+        # Um pedido maior que o burst nunca seria atendido
+        return rate, max(capacity, tokens)
+
+    def _try_local(self, provider: str, rate: float, capacity: float, requested: int = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tokens, ts = self._local.get(provider, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+            if tokens >= requested:
+                self._local[provider] = (tokens - requested, now)
+                return 0.0
+            self._local[provider] = (tokens, now)
+            return (requested - tokens) / rate
+
+    def try_acquire(self, provider: str, tokens: int = 1) -> float:
+        """Tries to take `tokens` tokens. Returns 0 on success, otherwise how long to wait."""
+        rate, capacity = self._limits(provider, tokens)
+        if rate is None:
+            return 0.0
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                if self._script is None:
+                    self._redis = redis.Redis.from_url(
+                        self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5
+                    )
+                    self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+                wait = self._script(keys=[f"ratelimit:{provider}"], args=[rate, capacity, tokens])
+                return float(wait)
+            except redis.RedisError as e:
+                print(f"Rate limiter: Redis unavailable, using a local bucket for {REDIS_RETRY_SECONDS}s ({e})")
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return self._try_local(provider, rate, capacity, tokens)
+
+    def acquire(self, provider: str, max_wait: Optional[float] = None, tokens: int = 1):
+        """
+        Blocks until `tokens` tokens (one per upstream request) are available. Raises
+        RateLimitedError if that would take longer than max_wait, so the caller can hand
+        the work back to Celery.
+        """
+        max_wait = settings.RATE_LIMIT_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.try_acquire(provider, tokens)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitedError(provider, retry_after=wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, provider: str, max_wait: Optional[float] = None, tokens: int = 1):
+        """Async version of acquire. The Redis call runs in a thread, off the event loop."""
+        max_wait = settings.RATE_LIMIT_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = await run_in_threadpool(self.try_acquire, provider, tokens)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitedError(provider, retry_after=wait)
+            await asyncio.sleep(wait)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Reads a Retry-After header given in seconds. HTTP dates are ignored."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(retries: int, retry_after: Optional[float] = None) -> float:
+    """
+    Exponential backoff with full jitter for the given retry number (0-based).
+    A Retry-After from the provider is honored as the minimum delay.
+    """
+    ceiling = min(settings.RETRY_BACKOFF_MAX_SECONDS, settings.RETRY_BACKOFF_BASE_SECONDS * (2 ** retries))
+    delay = random.uniform(0, ceiling)
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+rate_limiter = TokenBucketLimiter()
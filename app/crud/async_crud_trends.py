@@ -0,0 +1,62 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import models
+from app.crud import crud_trend_scores, crud_trends, search_index
+
+"""
+Leituras assíncronas do catálogo e das tendências, para os endpoints da API.
+
+Os statements são os mesmos das leituras síncronas de crud_trends e
+crud_trend_scores (usadas pelo Celery); aqui só muda a execução, com await em uma
+AsyncSession. Todas as colunas que os schemas de resposta leem são carregadas na
+consulta: em uma sessão assíncrona, um lazy load implícito falha.
+"""
+
+async def get_search_query_by_name_and_region(db: AsyncSession, query: str, region: str) -> Optional[models.SearchQuery]:
+    result = await db.scalars(
+        select(models.SearchQuery)
+        .where(models.SearchQuery.query == query, models.SearchQuery.region == region.upper())
+        .limit(1)
+    )
+    return result.first()
+
+async def get_filters_by_query_id(db: AsyncSession, search_query_id: int) -> List[models.Filter]:
+    result = await db.scalars(select(models.Filter).where(models.Filter.search_query_id == search_query_id))
+    return result.all()
+
+async def get_product(db: AsyncSession, product_id: int) -> Optional[models.Product]:
+    return await db.get(models.Product, product_id)
+
+async def get_products_by_region(db: AsyncSession, region: str, **kwargs) -> List[models.Product]:
+    """
+    Lista os produtos da região; os argumentos são os de crud_trends.products_by_region_query.
+    Levanta ValueError para ordenação, campo ou cursor inválidos.
+    """
+    result = await db.scalars(crud_trends.products_by_region_query(region, **kwargs))
+    return result.all()
+
+async def search_products(db: AsyncSession, region: str, query: str, skip: int = 0, limit: int = 20) -> List[models.Product]:
+    """
+    Busca textual. Fora do Postgres, o índice em memória (síncrono) roda na conexão
+    da sessão via run_sync.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        ids = await db.run_sync(search_index.search_product_ids, region, query, skip, limit)
+        result = await db.scalars(crud_trends.products_by_ids_query(ids))
+        return crud_trends.order_by_ids(result, ids)
+    result = await db.scalars(crud_trends.search_products_query(region, query, skip=skip, limit=limit))
+    return result.all()
+
+async def get_trend(db: AsyncSession, trend_id: int) -> Optional[models.Trend]:
+    return await db.get(models.Trend, trend_id)
+
+async def get_trend_products(db: AsyncSession, trend_id: int, skip: int = 0, limit: int = 20) -> List[models.Product]:
+    result = await db.scalars(crud_trends.trend_products_query(trend_id, skip=skip, limit=limit))
+    return result.all()
+
+async def get_trend_rankings(
+    db: AsyncSession, region: str, category: str, skip: int = 0, limit: int = 20
+) -> List[models.TrendRanking]:
+    result = await db.scalars(crud_trend_scores.trend_rankings_query(region, category, skip=skip, limit=limit))
+    return result.all()
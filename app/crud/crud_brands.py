@@ -1,15 +1,29 @@
+from typing import Iterable, List, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.database import models
 
 def get_brands(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Brand).offset(skip).limit(limit).all()
 
-def get_or_create_brand(db: Session, brand_name: str) -> models.Brand:
-    """Busca uma marca pelo nome, se não existir, cria uma nova."""
-    brand = db.query(models.Brand).filter(models.Brand.name == brand_name).first()
-    if not brand:
-        brand = models.Brand(name=brand_name)
-        db.add(brand)
-        db.commit()
-        db.refresh(brand)
-    return brand
+def get_brand_names(db: Session) -> List[str]:
+    """Retorna os nomes de todas as marcas cadastradas."""
+    return [name for (name,) in db.query(models.Brand.name)]
+
+def get_brands_signature(db: Session) -> Tuple[int, int]:
+    """Retorna (quantidade, maior id) das marcas, usado para detectar mudanças na tabela."""
+    count, max_id = db.query(func.count(models.Brand.id), func.max(models.Brand.id)).one()
+    return count, max_id or 0
+
+def ensure_brands(db: Session, brand_names: Iterable[str]) -> int:
+    """
+    Cria as marcas da lista que ainda não existem. Não faz commit: as marcas entram
+    na transação do chamador.
+    """
+    names = set(brand_names)
+    existing = {name for (name,) in db.query(models.Brand.name).filter(models.Brand.name.in_(names))}
+    missing = names - existing
+    if missing:
+        db.add_all([models.Brand(name=name) for name in missing])
+        db.flush()
+    return len(missing)
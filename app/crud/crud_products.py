@@ -1,41 +1,106 @@
+from typing import List, Optional
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from app.crud.utils import dialect_insert
 from app.database import models
 
-def create_product(
-    db: Session, 
-    product_data: dict, 
-    store_id: int, 
-    trend_id: int, 
-    brand_id: int = None, 
-    category_id: int = None
-) -> models.Product:
+# Categoria da busca de uma tendência sem categoria mapeada
+TREND_SEARCH_CATEGORY = "tendencias"
+
+PRODUCT_COLUMNS = ("title", "price", "thumbnail_url", "store_name", "store_link", "brand", "rating", "reviews")
+
+def get_or_create_trend_search_query(db: Session, trend: models.Trend) -> models.SearchQuery:
     """
-    Cria um novo produto e o associa a uma tendência, loja, e opcionalmente a uma marca e categoria.
+    Retorna a busca à qual os produtos de uma tendência ficam associados, criando-a se
+    necessário. É criada inativa, para não entrar no sync do catálogo.
     """
-    # 1. Cria a instância do produto
-    db_product = models.Product(
-        title=product_data.get('title'),
-        link=product_data.get('link'),
-        price=product_data.get('price'),
-        thumbnail=product_data.get('imageUrl'),
-        store_id=store_id,
-        brand_id=brand_id
+    search_query = (
+        db.query(models.SearchQuery)
+        .filter(models.SearchQuery.query == trend.name, models.SearchQuery.region == trend.region)
+        .first()
     )
-    db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    if not search_query:
+        search_query = models.SearchQuery(
+            query=trend.name,
+            category=trend.category or TREND_SEARCH_CATEGORY,
+            region=trend.region,
+            is_active=False,
+        )
+        db.add(search_query)
+        db.flush()
+    return search_query
 
-    # 2. Associa o produto à tendência na tabela 'trend_products'
-    trend = db.query(models.Trend).filter(models.Trend.id == trend_id).first()
-    if trend:
-        trend.products.append(db_product)
-        db.commit()
+def create_products_bulk(
+    db: Session,
+    products_data: List[dict],
+    trend: models.Trend,
+    category_id: Optional[int] = None,
+) -> List[int]:
+    """
+    Cria vários produtos e os associa à tendência e, opcionalmente, à categoria em uma única transação.
+
+    Cada dict tem 'google_product_id' e as colunas de PRODUCT_COLUMNS ('title' e 'store_link'
+    obrigatórios). Os produtos novos ficam na região da tendência, associados à sua busca
+    (get_or_create_trend_search_query). Produtos já cadastrados com o mesmo google_product_id,
+    inclusive os do catálogo, são reaproveitados sem alteração, e associações que já existem
+    são ignoradas.
+    Retorna os ids dos produtos, na ordem da lista (sem duplicatas).
+    """
+    products_by_id = {}
+    for product_data in products_data:
+        google_product_id = product_data.get('google_product_id')
+        if google_product_id and google_product_id not in products_by_id:
+            products_by_id[google_product_id] = product_data
+    if not products_by_id:
+        return []
 
-    # 3. Associa o produto à categoria na tabela 'product_categories'
+    # 1. Insere os produtos novos (ON CONFLICT DO NOTHING) e lê os ids de todos
+    search_query = get_or_create_trend_search_query(db, trend)
+    rows = [
+        {
+            "google_product_id": google_product_id,
+            "search_query_id": search_query.id,
+            "region": trend.region,
+            **{column: product_data.get(column) for column in PRODUCT_COLUMNS},
+        }
+        for google_product_id, product_data in products_by_id.items()
+    ]
+    db.execute(
+        dialect_insert(db, models.Product.__table__)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["google_product_id"])
+    )
+    product_ids = dict(
+        db.query(models.Product.google_product_id, models.Product.id)
+        .filter(models.Product.google_product_id.in_(list(products_by_id)))
+    )
+    ids = [product_ids[google_product_id] for google_product_id in products_by_id if google_product_id in product_ids]
+    # 2. Associa os produtos à tendência na tabela 'trend_products'
+    trend_id = trend.id
+    linked = {
+        product_id for (product_id,) in db.query(models.trend_products.c.product_id).filter(
+            models.trend_products.c.trend_id == trend_id,
+            models.trend_products.c.product_id.in_(ids),
+        )
+    }
+    trend_links = [{"trend_id": trend_id, "product_id": product_id} for product_id in ids if product_id not in linked]
+    if trend_links:
+        db.execute(insert(models.trend_products), trend_links)
+
+    # 3. Associa os produtos à categoria na tabela 'product_categories'
     if category_id:
-        category = db.query(models.Category).filter(models.Category.id == category_id).first()
-        if category:
-            db_product.categories.append(category)
-            db.commit()
-            
-    return db_product
+        categorized = {
+            product_id for (product_id,) in db.query(models.product_categories.c.product_id).filter(
+                models.product_categories.c.category_id == category_id,
+                models.product_categories.c.product_id.in_(ids),
+            )
+        }
+        category_links = [
+            {"product_id": product_id, "category_id": category_id}
+            for product_id in ids if product_id not in categorized
+        ]
+        if category_links:
+            db.execute(insert(models.product_categories), category_links)
+
+    db.commit()
+    return ids
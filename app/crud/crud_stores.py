@@ -1,15 +1,22 @@
+from typing import Iterable
 from sqlalchemy.orm import Session
+from app.crud.utils import dialect_insert
 from app.database import models
 
 def get_stores(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Store).offset(skip).limit(limit).all()
 
-def get_or_create_store(db: Session, store_name: str) -> models.Store:
-    """Busca uma loja pelo nome, se não existir, cria uma nova."""
-    store = db.query(models.Store).filter(models.Store.name == store_name).first()
-    if not store:
-        store = models.Store(name=store_name)
-        db.add(store)
-        db.commit()
-        db.refresh(store)
-    return store
+def ensure_stores(db: Session, store_names: Iterable[str]):
+    """
+    Cria, com um único INSERT ... ON CONFLICT DO NOTHING, as lojas da lista que ainda
+    não existem. Não faz commit: as lojas entram na transação do chamador.
+    """
+    names = sorted({name for name in store_names if name})
+    if not names:
+        return
+    db.execute(
+        dialect_insert(db, models.Store.__table__)
+        .values([{"name": name} for name in names])
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    db.flush()
@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Select, bindparam, select, update
+from sqlalchemy.orm import Session, joinedload
+from app.database import models
+
+# Categoria usada no ranking geral da região
+ALL_CATEGORIES = "*"
+
+def get_trends_for_scoring(db: Session, trend_ids: List[int]) -> List[models.Trend]:
+    """
+    Carrega as tendências com lock de linha (FOR UPDATE) até o commit de save_trend_scores.
+    populate_existing sobrescreve as já presentes na sessão com os valores lidos sob o
+    lock, e não os de antes de uma ingestão concorrente.
+    """
+    if not trend_ids:
+        return []
+    return (
+        db.query(models.Trend)
+        .filter(models.Trend.id.in_(trend_ids))
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+
+def save_trend_scores(db: Session, observations: List[dict], scores: List[dict]):
+    """
+    Grava as observações e as novas pontuações agregadas em uma única transação.
+
+    :param observations: [{'trend_id', 'source', 'score', 'observed_at'}]
+    :param scores: [{'trend_id', 'new_score', 'new_score_updated_at', 'new_score_rank_key'}]
+    """
+    if observations:
+        db.execute(models.TrendObservation.__table__.insert(), observations)
+    if scores:
+        stmt = (
+            update(models.Trend.__table__)
+            .where(models.Trend.__table__.c.id == bindparam("trend_id"))
+            .values(
+                score=bindparam("new_score"),
+                score_updated_at=bindparam("new_score_updated_at"),
+                score_rank_key=bindparam("new_score_rank_key"),
+            )
+        )
+        db.connection().execute(stmt, scores)
+    db.commit()
+
+def get_trend_score_states(db: Session, region: str) -> List[Tuple[int, Optional[str], float, Optional[datetime]]]:
+    """Retorna (id, categoria, pontuação, score_updated_at) das tendências pontuadas da região."""
+    return db.query(
+        models.Trend.id, models.Trend.category, models.Trend.score, models.Trend.score_updated_at
+    ).filter(
+        models.Trend.region == region.upper(),
+        models.Trend.score_updated_at.isnot(None),
+    ).all()
+
+def save_trend_rank_keys(db: Session, keys: List[dict]):
+    """Grava as chaves de ordenação. :param keys: [{'trend_id', 'new_score_rank_key'}]"""
+    if keys:
+        stmt = (
+            update(models.Trend.__table__)
+            .where(models.Trend.__table__.c.id == bindparam("trend_id"))
+            .values(score_rank_key=bindparam("new_score_rank_key"))
+        )
+        db.connection().execute(stmt, keys)
+    db.commit()
+
+def get_top_trends(
+    db: Session, region: str, category: Optional[str], size: int
+) -> List[Tuple[int, float, Optional[datetime]]]:
+    """
+    Retorna (id, pontuação, score_updated_at) das `size` tendências de maior
+    score_rank_key da região (e da categoria, se informada), com ORDER BY ... LIMIT
+    sobre os índices (região[, categoria], score_rank_key).
+    """
+    query = db.query(models.Trend.id, models.Trend.score, models.Trend.score_updated_at).filter(
+        models.Trend.region == region.upper(),
+        models.Trend.score_rank_key.isnot(None),
+    )
+    if category is not None:
+        query = query.filter(models.Trend.category == category)
+    return query.order_by(models.Trend.score_rank_key.desc(), models.Trend.id).limit(size).all()
+
+def replace_trend_rankings(db: Session, rankings: Dict[Tuple[str, str], List[dict]]):
+    """Substitui, em uma única transação, o top-N de cada (região, categoria) em `rankings`."""
+    for region, category in rankings:
+        db.query(models.TrendRanking).filter(
+            models.TrendRanking.region == region.upper(), models.TrendRanking.category == category
+        ).delete(synchronize_session=False)
+    rows = [row for category_rows in rankings.values() for row in category_rows]
+    if rows:
+        db.execute(models.TrendRanking.__table__.insert(), rows)
+    db.commit()
+
+def trend_rankings_query(region: str, category: str, skip: int = 0, limit: int = 20) -> Select:
+    """Top-N pré-calculado, lido pela chave primária (região, categoria, posição)."""
+    return (
+        select(models.TrendRanking)
+        .options(joinedload(models.TrendRanking.trend))
+        .where(models.TrendRanking.region == region.upper(), models.TrendRanking.category == category)
+        .order_by(models.TrendRanking.rank)
+        .offset(skip)
+        .limit(limit)
+    )
+
+def get_trend_rankings(
+    db: Session, region: str, category: str, skip: int = 0, limit: int = 20
+) -> List[models.TrendRanking]:
+    """Lê o top-N pré-calculado pela chave primária (região, categoria, posição)."""
+    return db.scalars(trend_rankings_query(region, category, skip=skip, limit=limit)).all()
@@ -1,5 +1,14 @@
-from sqlalchemy.orm import Session
+import base64
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import Select, and_, bindparam, case, cast, func, literal_column, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session, load_only
 from app.database import models
+from app.crud import search_index
+from app.crud.utils import dialect_insert
 from app.schemas import trend as catalog_schema # I'm using 'trend' as it's the real filename
 
 # CRUD for SearchQuery
@@ -19,47 +28,490 @@ def get_search_query_by_name_and_region(db: Session, query: str, region: str):
     return db.query(models.SearchQuery).filter(models.SearchQuery.query == query, models.SearchQuery.region == region.upper()).first()
 
 # CRUD for Filter
-def get_or_create_filter(db: Session, search_query_id: int, name: str, type: str):
-    db_filter = db.query(models.Filter).filter(models.Filter.search_query_id == search_query_id, models.Filter.name == name).first()
-    if not db_filter:
-        db_filter = models.Filter(search_query_id=search_query_id, name=name, type=type)
-        db.add(db_filter)
-        db.commit()
-        db.refresh(db_filter)
-    return db_filter
+def bulk_sync_filters(db: Session, search_query_id: int, filters: Iterable[Tuple[str, str]], prune: bool = False) -> dict:
+    """
+    Writes all (name, type) filter options of a search query in one statement,
+    relying on the UNIQUE(search_query_id, name) constraint.
+    If prune is True, filters no longer returned for the query are deleted in the same transaction.
+    """
+    # Deduplicates by name, as the unique constraint does; the first type seen wins.
+    unique_filters = {}
+    for name, filter_type in filters:
+        if name and name not in unique_filters:
+            unique_filters[name] = filter_type
+
+    counts = {"written": len(unique_filters), "pruned": 0}
+    if unique_filters:
+        stmt = dialect_insert(db, models.Filter.__table__).values([
+            {"search_query_id": search_query_id, "name": name, "type": filter_type}
+            for name, filter_type in unique_filters.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["search_query_id", "name"],
+            set_={"type": stmt.excluded.type},
+        )
+        db.execute(stmt)
+
+    if prune:
+        stale = db.query(models.Filter).filter(models.Filter.search_query_id == search_query_id)
+        if unique_filters:
+            stale = stale.filter(models.Filter.name.notin_(list(unique_filters)))
+        counts["pruned"] = stale.delete(synchronize_session=False)
+
+    # The query's products are searchable by its filter names: refresh them with the new set
+    search_filters = search_filters_text(get_filter_names_by_query_ids(db, [search_query_id]).get(search_query_id))
+    _update_search_filters(db, {search_query_id: search_filters})
+    counts["search_filters"] = search_filters
+
+    db.commit()
+    return counts
+
+def search_filters_text(names: Optional[Iterable[str]]) -> Optional[str]:
+    """The products.search_filters value for a search query's filter names."""
+    return " ".join(names or []) or None
+
+def _update_search_filters(db: Session, search_filters: dict):
+    """Sets search_filters on the products of each {search_query_id: text}, skipping rows already up to date."""
+    if not search_filters:
+        return
+    table = models.Product.__table__
+    stmt = (
+        update(table)
+        .where(
+            table.c.search_query_id == bindparam("query_id"),
+            table.c.search_filters.is_distinct_from(bindparam("new_search_filters")),
+        )
+        .values(search_filters=bindparam("new_search_filters"))
+    )
+    db.connection().execute(stmt, [
+        {"query_id": search_query_id, "new_search_filters": text}
+        for search_query_id, text in search_filters.items()
+    ])
+
+def refresh_search_filters(db: Session, search_query_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rewrites products.search_filters from the current filters of the given search
+    queries (all of them by default), e.g. to backfill products saved before the
+    column existed. Returns the number of search queries refreshed.
+    """
+    if search_query_ids is None:
+        search_query_ids = [search_query_id for (search_query_id,) in db.query(models.SearchQuery.id)]
+    search_query_ids = list(search_query_ids)
+    names = get_filter_names_by_query_ids(db, search_query_ids)
+    _update_search_filters(db, {
+        search_query_id: search_filters_text(names.get(search_query_id)) for search_query_id in search_query_ids
+    })
+    db.commit()
+    return len(search_query_ids)
 
 def get_filters_by_query_id(db: Session, search_query_id: int):
     return db.query(models.Filter).filter(models.Filter.search_query_id == search_query_id).all()
 
+# CRUD for Trend
+def get_trends_by_name_and_region(db: Session, keys: List[Tuple[str, str]]) -> dict:
+    """
+    Loads the trends matching the given (name, region) pairs with a single IN query.
+    Returns {(name, region): Trend}.
+    """
+    if not keys:
+        return {}
+    trends = db.query(models.Trend).filter(
+        tuple_(models.Trend.name, models.Trend.region).in_([(name, region.upper()) for name, region in keys])
+    )
+    return {(trend.name, trend.region): trend for trend in trends}
+
+def get_trends_by_normalized_name(
+    db: Session, keys: List[Tuple[str, str]], names: List[Tuple[str, str]] = ()
+) -> List[models.Trend]:
+    """
+    Loads, in a single query, the trends whose (normalized_name, region) is in `keys`
+    or whose (name, region) is in `names` (rows saved before normalized_name existed).
+    """
+    conditions = []
+    if keys:
+        conditions.append(tuple_(models.Trend.normalized_name, models.Trend.region).in_(
+            [(key, region.upper()) for key, region in keys]
+        ))
+    if names:
+        conditions.append(tuple_(models.Trend.name, models.Trend.region).in_(
+            [(name, region.upper()) for name, region in names]
+        ))
+    if not conditions:
+        return []
+    return db.query(models.Trend).filter(or_(*conditions)).all()
+
+def create_trends_bulk(db: Session, trends: List[catalog_schema.TrendCreate]) -> int:
+    """
+    Inserts the trends in one statement. Trends created concurrently by another
+    worker are skipped through the UNIQUE(name, region) constraint.
+    """
+    if not trends:
+        return 0
+    rows = [{**trend.model_dump(), "region": trend.region.upper()} for trend in trends]
+    stmt = dialect_insert(db, models.Trend.__table__).values(rows)
+    stmt = stmt.on_conflict_do_nothing(index_elements=["name", "region"])
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
+
+def get_trend(db: Session, trend_id: int) -> Optional[models.Trend]:
+    return db.query(models.Trend).filter(models.Trend.id == trend_id).first()
+
+def trend_products_query(trend_id: int, skip: int = 0, limit: int = 20) -> Select:
+    """
+    Statement for a trend's products, most reviewed first, with a single join through
+    trend_products instead of loading the Trend.products relationship.
+    Shared by the sync and async (app.crud.async_crud_trends) reads.
+    """
+    return (
+        select(models.Product)
+        .options(product_load_only())
+        .join(models.trend_products, models.trend_products.c.product_id == models.Product.id)
+        .where(models.trend_products.c.trend_id == trend_id)
+        .order_by(models.Product.reviews.desc().nullslast(), models.Product.rating.desc().nullslast(), models.Product.id)
+        .offset(skip)
+        .limit(limit)
+    )
+
+def get_trend_products(db: Session, trend_id: int, skip: int = 0, limit: int = 20) -> List[models.Product]:
+    """Returns a trend's products, most reviewed first."""
+    return db.scalars(trend_products_query(trend_id, skip=skip, limit=limit)).all()
+
+def claim_trends_for_enrichment(db: Session, trend_ids: Iterable[int], cutoff: datetime, now: datetime) -> List[int]:
+    """
+    Sets enrichment_requested_at = now on the given trends that were neither enriched nor
+    queued for enrichment since `cutoff`, in one conditional UPDATE, and returns their ids.
+    Concurrent callers never claim the same trend, so only the returned ids are dispatched.
+    """
+    trend_ids = list(trend_ids)
+    if not trend_ids:
+        return []
+    table = models.Trend.__table__
+    stmt = (
+        update(table)
+        .where(
+            table.c.id.in_(trend_ids),
+            or_(table.c.enrichment_requested_at.is_(None), table.c.enrichment_requested_at < cutoff),
+            or_(table.c.enriched_at.is_(None), table.c.enriched_at < cutoff),
+        )
+        .values(enrichment_requested_at=now)
+        .returning(table.c.id)
+    )
+    claimed = sorted(db.execute(stmt).scalars())
+    db.commit()
+    return claimed
+
+def mark_trend_enriched(db: Session, trend_id: int):
+    db.query(models.Trend).filter(models.Trend.id == trend_id).update(
+        {models.Trend.enriched_at: func.now()}, synchronize_session=False
+    )
+    db.commit()
+
+# CRUD for SyncRun
+SYNC_RUN_COUNTERS = (
+    "queries_synced", "queries_failed", "products_fetched", "products_inserted",
+    "products_updated", "products_unchanged", "products_skipped", "products_failed",
+)
+
+def create_sync_run(db: Session, region: str, queries_total: int) -> models.SyncRun:
+    sync_run = models.SyncRun(region=region.upper(), status="running", queries_total=queries_total)
+    db.add(sync_run)
+    db.commit()
+    db.refresh(sync_run)
+    return sync_run
+
+def finish_sync_run(db: Session, sync_run_id: int, status: str, counts: dict, failures: list = None) -> models.SyncRun:
+    """Records the outcome of a sync run: status, counters, failures and wall-clock duration."""
+    sync_run = db.query(models.SyncRun).filter(models.SyncRun.id == sync_run_id).first()
+    if not sync_run:
+        return None
+    finished_at = datetime.now(timezone.utc)
+    started_at = sync_run.started_at
+    if started_at and started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    sync_run.status = status
+    sync_run.finished_at = finished_at
+    sync_run.duration_seconds = (finished_at - started_at).total_seconds() if started_at else None
+    for counter in SYNC_RUN_COUNTERS:
+        setattr(sync_run, counter, counts.get(counter, 0))
+    sync_run.failures = failures or []
+    db.commit()
+    db.refresh(sync_run)
+    return sync_run
+
 # CRUD for Product
-def create_or_update_product(db: Session, product: catalog_schema.ProductCreate):
+def bulk_upsert_products(
+    db: Session,
+    products: List[catalog_schema.ProductCreate],
+    chunk_size: int = 500,
+    search_filters: Optional[dict] = None,
+) -> dict:
     """
-    Creates a new product or updates it if it already exists based on google_product_id.
+    Inserts or updates a list of products with one INSERT ... ON CONFLICT (google_product_id)
+    DO UPDATE per chunk, committing once at the end.
+
+    Products whose content_fingerprint matches the stored one are not rewritten (only a changed
+    listing_fingerprint is recorded) and keep their updated_at.
+    search_filters ({search_query_id: text}, from bulk_sync_filters) is written to the rows
+    that are inserted or updated; without it the column is left to bulk_sync_filters.
+    Returns a dict with the number of inserted, updated and unchanged rows.
     """
-    db_product = db.query(models.Product).filter(models.Product.google_product_id == product.google_product_id).first()
+    # The last occurrence of a google_product_id wins, as it would with sequential upserts.
+    # Postgres refuses to touch the same row twice within a single ON CONFLICT statement.
+    unique_products = {p.google_product_id: p for p in products}
+    rows = [p.model_dump() for p in unique_products.values()]
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return counts
+
+    if search_filters is not None:
+        for row in rows:
+            row["search_filters"] = search_filters.get(row["search_query_id"])
+
+    table = models.Product.__table__
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        ids = [row["google_product_id"] for row in chunk]
+        stored = {
+            google_product_id: (content_fp, listing_fp)
+            for google_product_id, content_fp, listing_fp in db.query(
+                models.Product.google_product_id,
+                models.Product.content_fingerprint,
+                models.Product.listing_fingerprint,
+            ).filter(models.Product.google_product_id.in_(ids))
+        }
+
+        to_write = []
+        for row in chunk:
+            fingerprints = stored.get(row["google_product_id"])
+            if fingerprints is None:
+                counts["inserted"] += 1
+                to_write.append(row)
+            elif row["content_fingerprint"] and fingerprints[0] == row["content_fingerprint"]:
+                counts["unchanged"] += 1
+                if fingerprints[1] != row["listing_fingerprint"]:
+                    to_write.append(row)
+            else:
+                counts["updated"] += 1
+                to_write.append(row)
+        if not to_write:
+            continue
+
+        stmt = dialect_insert(db, table).values(to_write)
+        update_columns = {
+            key: stmt.excluded[key]
+            for key in to_write[0].keys()
+            if key != "google_product_id"
+        }
+        content_changed = or_(
+            stmt.excluded.content_fingerprint.is_(None),
+            table.c.content_fingerprint.is_distinct_from(stmt.excluded.content_fingerprint),
+        )
+        update_columns["updated_at"] = case((content_changed, func.now()), else_=table.c.updated_at)
+        stmt = stmt.on_conflict_do_update(index_elements=["google_product_id"], set_=update_columns)
+        db.execute(stmt)
 
-    if db_product:
-        # Update existing product
-        update_data = product.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_product, key, value)
-    else:
-        # Create new product
-        db_product = models.Product(**product.model_dump())
-        db.add(db_product)
-    
     db.commit()
-    db.refresh(db_product)
-    return db_product
+    return counts
+
+def get_filter_names_by_query_ids(db: Session, search_query_ids: Iterable[int]) -> dict:
+    """Returns {search_query_id: [filter names]} with a single query."""
+    names = {}
+    if not search_query_ids:
+        return names
+    for search_query_id, name in db.query(models.Filter.search_query_id, models.Filter.name).filter(
+        models.Filter.search_query_id.in_(search_query_ids)
+    ).order_by(models.Filter.search_query_id, models.Filter.id):
+        names.setdefault(search_query_id, []).append(name)
+    return names
+
+def get_listing_fingerprints(db: Session, google_product_ids: List[str]) -> dict:
+    """Returns {google_product_id: listing_fingerprint} for the given products that are already stored."""
+    if not google_product_ids:
+        return {}
+    return dict(
+        db.query(models.Product.google_product_id, models.Product.listing_fingerprint)
+        .filter(models.Product.google_product_id.in_(google_product_ids))
+    )
+
+# Keyset pagination for products
+PRODUCT_SORTS = ("updated_at", "price")
+
+def encode_product_cursor(product: models.Product, sort: str) -> str:
+    """Builds the opaque cursor pointing right after the given product."""
+    value = getattr(product, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif value is not None:
+        value = str(value)
+    raw = json.dumps([sort, value, product.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_product_cursor(cursor: str, sort: str) -> Tuple[Optional[object], int]:
+    """
+    Decodes a cursor created by encode_product_cursor.
+    Raises ValueError if the cursor is malformed or was created for another sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort:
+            raise ValueError(f"Cursor was created for sort '{cursor_sort}'")
+        if value is not None:
+            value = datetime.fromisoformat(value) if sort == "updated_at" else Decimal(value)
+        return value, int(last_id)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+# Column projection for product listings: the JSON blobs (variants, other_details)
+# are only loaded when asked for, e.g. by the product detail endpoint
+PRODUCT_LIST_FIELDS = (
+    "id", "google_product_id", "search_query_id", "title", "brand", "price",
+    "thumbnail_url", "store_name", "store_link", "rating", "reviews",
+)
+PRODUCT_FIELDS = PRODUCT_LIST_FIELDS + ("region", "variants", "other_details", "created_at", "updated_at")
 
-def get_products_by_region(db: Session, region: str, skip: int = 0, limit: int = 100, category: str = None, brand: str = None, price_max: float = None):
-    query = db.query(models.Product).filter(models.Product.region == region.upper())
+def product_load_only(fields: Iterable[str] = PRODUCT_LIST_FIELDS, *extra: str):
+    """
+    Returns a load_only() option loading just `fields` (plus id and any `extra`
+    columns the caller needs, such as the sort column for cursors).
+    Raises ValueError for unknown fields.
+    """
+    columns = set(fields) | {"id", *extra}
+    unknown = columns - set(PRODUCT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return load_only(*(getattr(models.Product, column) for column in sorted(columns)))
+
+def get_product(db: Session, product_id: int) -> Optional[models.Product]:
+    return db.query(models.Product).filter(models.Product.id == product_id).first()
+
+def products_by_region_query(
+    region: str,
+    skip: int = 0,
+    limit: int = 100,
+    category: str = None,
+    brand: str = None,
+    price_max: float = None,
+    sort: str = "updated_at",
+    cursor: str = None,
+    fields: Optional[Iterable[str]] = PRODUCT_LIST_FIELDS,
+) -> Select:
+    """
+    Builds the product listing statement of a region, shared by the sync and async
+    (app.crud.async_crud_trends) reads. Results are ordered by most recently updated
+    (sort="updated_at") or cheapest first (sort="price"), with ties broken by id.
+    When a cursor is given, the listing resumes right after it and skip is ignored.
+    Only `fields` are loaded (the list columns by default, every column with None);
+    raises ValueError for an unknown sort or field.
+    """
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f"Unsupported sort '{sort}'")
+
+    query = select(models.Product).where(models.Product.region == region.upper())
+    if fields is not None:
+        query = query.options(product_load_only(fields, sort))
     if category:
         # This requires a join with search_queries
-        query = query.join(models.SearchQuery).filter(models.SearchQuery.category == category)
+        query = query.join(models.Product.search_query).where(models.SearchQuery.category == category)
     if brand:
-        query = query.filter(models.Product.brand.ilike(f"%{brand}%"))
+        query = query.where(models.Product.brand.ilike(f"%{brand}%"))
     if price_max:
-        query = query.filter(models.Product.price <= price_max)
-        
-    return query.offset(skip).limit(limit).all()
\ No newline at end of file
+        query = query.where(models.Product.price <= price_max)
+
+    if sort == "price":
+        order_by = (models.Product.price.asc().nulls_last(), models.Product.id.asc())
+    else:
+        order_by = (models.Product.updated_at.desc(), models.Product.id.desc())
+    query = query.order_by(*order_by)
+
+    if cursor:
+        value, last_id = decode_product_cursor(cursor, sort)
+        if sort == "price":
+            if value is None:
+                query = query.where(and_(models.Product.price.is_(None), models.Product.id > last_id))
+            else:
+                query = query.where(or_(
+                    tuple_(models.Product.price, models.Product.id) > tuple_(value, last_id),
+                    models.Product.price.is_(None),
+                ))
+        else:
+            query = query.where(tuple_(models.Product.updated_at, models.Product.id) < tuple_(value, last_id))
+    else:
+        query = query.offset(skip)
+
+    return query.limit(limit)
+
+def get_products_by_region(db: Session, region: str, **kwargs) -> List[models.Product]:
+    """
+    Lists the products of a region; see products_by_region_query for the arguments.
+    Raises ValueError for an unknown sort, field or a malformed cursor.
+    """
+    return db.scalars(products_by_region_query(region, **kwargs)).all()
+
+# Full-text search
+SEARCH_CONFIGS = {"BR": "portuguese", "US": "english", "EU": "german"}
+
+def search_products_query(region: str, query: str, skip: int = 0, limit: int = 20) -> Select:
+    """
+    Postgres full-text statement: matches the generated `search_vector` column (GIN
+    index) with websearch_to_tsquery in the region's language, ranked by ts_rank_cd.
+    """
+    region = region.upper()
+    search_vector = literal_column("products.search_vector")
+    tsquery = func.websearch_to_tsquery(cast(SEARCH_CONFIGS.get(region, "simple"), REGCONFIG), query)
+    return (
+        select(models.Product)
+        .options(product_load_only())
+        .where(models.Product.region == region, search_vector.op("@@")(tsquery))
+        .order_by(func.ts_rank_cd(search_vector, tsquery).desc(), models.Product.id)
+        .offset(skip)
+        .limit(limit)
+    )
+
+def products_by_ids_query(ids: Iterable[int]) -> Select:
+    """Statement loading the list columns of the given products (in any order)."""
+    return select(models.Product).options(product_load_only()).where(models.Product.id.in_(list(ids)))
+
+def order_by_ids(products: Iterable[models.Product], ids: List[int]) -> List[models.Product]:
+    """Puts `products` in the order of `ids`, dropping ids that were not found."""
+    by_id = {p.id: p for p in products}
+    return [by_id[product_id] for product_id in ids if product_id in by_id]
+
+def search_products(db: Session, region: str, query: str, skip: int = 0, limit: int = 20) -> List[models.Product]:
+    """
+    Full-text search over title, brand, store name and filter names, best matches first.
+
+    On Postgres it runs search_products_query. Other databases use the in-process
+    index in app.crud.search_index.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        ids = search_index.search_product_ids(db, region, query, skip=skip, limit=limit)
+        return order_by_ids(db.scalars(products_by_ids_query(ids)), ids)
+    return db.scalars(search_products_query(region, query, skip=skip, limit=limit)).all()
+
+# Streaming export
+EXPORT_COLUMNS = (
+    "id", "google_product_id", "search_query_id", "region", "title", "brand", "price",
+    "thumbnail_url", "store_name", "store_link", "rating", "reviews", "variants",
+    "other_details", "created_at", "updated_at",
+)
+
+def iter_product_rows(db: Session, region: str, columns: Iterable[str] = EXPORT_COLUMNS, batch_size: int = 2000):
+    """
+    Yields the region's products as plain row tuples of `columns`, ordered by id.
+
+    Selects columns rather than entities, so no ORM objects are built, and uses
+    yield_per so the driver streams rows from a server-side cursor in batches of
+    `batch_size` instead of buffering the whole result.
+    """
+    table = models.Product.__table__
+    stmt = (
+        select(*(table.c[column] for column in columns))
+        .where(table.c.region == region.upper())
+        .order_by(table.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.execute(stmt)
@@ -0,0 +1,31 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.database import models
+
+"""
+Cache por worker das categorias (slug -> id).
+
+Mantém o mapa com tamanho limitado e TTL, de modo que o enriquecimento de uma
+tendência faça uma query por categoria nova, e não uma por tendência. As categorias
+só são lidas, nunca criadas aqui, então o cache nunca guarda um id não gravado.
+"""
+
+_categories = LRUCache(settings.LOOKUP_CACHE_MAX_ENTRIES)
+
+
+def get_category_id(db: Session, slug: str) -> Optional[int]:
+    """Retorna o id da categoria com esse slug, ou None. Categorias não são criadas aqui."""
+    cached_id = _categories.get(slug)
+    if cached_id is not None:
+        return cached_id
+    category_id = db.query(models.Category.id).filter(models.Category.slug == slug).scalar()
+    if category_id is not None:
+        _categories.set(slug, category_id, settings.LOOKUP_CACHE_TTL_SECONDS)
+    return category_id
+
+
+def clear():
+    """Esvazia o cache deste worker."""
+    _categories.clear()
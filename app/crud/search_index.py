@@ -0,0 +1,101 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import models
+
+"""
+Índice invertido em memória para a busca textual de produtos.
+
+É o fallback de crud_trends.search_products quando o banco não é Postgres (SQLite
+nos testes e no benchmark). Indexa os mesmos campos do tsvector, com pesos
+equivalentes aos do setweight (título > marca > loja/filtros), e ordena por tf-idf.
+Há um índice por região, reconstruído quando os produtos da região mudam.
+"""
+
+# Pesos equivalentes aos setweight 'A', 'B' e 'C' do search_vector
+FIELD_WEIGHTS = {"title": 3.0, "brand": 2.0, "store_name": 1.0, "search_filters": 1.0}
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens sem acentos e em minúsculas."""
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", text)
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return _TOKEN.findall(folded)
+
+
+class ProductSearchIndex:
+    """
+    Postings token -> {product_id: frequência ponderada}. Uma busca exige todos os
+    termos (como o websearch_to_tsquery) e soma tf * idf de cada termo.
+    """
+    def __init__(self, rows: Iterable[Tuple]):
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.size = 0
+        for product_id, *values in rows:
+            self.size += 1
+            for field, value in zip(FIELD_WEIGHTS, values):
+                for token in tokenize(value):
+                    postings = self.postings[token]
+                    postings[product_id] = postings.get(product_id, 0.0) + FIELD_WEIGHTS[field]
+
+    def search(self, query: str, skip: int = 0, limit: int = 20) -> List[int]:
+        terms = set(tokenize(query))
+        if not terms or any(term not in self.postings for term in terms):
+            return []
+        # Intersecta a partir do termo mais raro
+        ordered = sorted(terms, key=lambda term: len(self.postings[term]))
+        candidates = set(self.postings[ordered[0]])
+        for term in ordered[1:]:
+            candidates &= self.postings[term].keys()
+        scores = {product_id: 0.0 for product_id in candidates}
+        for term in terms:
+            postings = self.postings[term]
+            idf = math.log(1 + self.size / len(postings))
+            for product_id in candidates:
+                scores[product_id] += postings[product_id] * idf
+        ranked = sorted(scores, key=lambda product_id: (-scores[product_id], product_id))
+        return ranked[skip:skip + limit]
+
+
+_indexes: Dict[str, Tuple[tuple, ProductSearchIndex]] = {}
+_lock = threading.Lock()
+
+
+def search_product_ids(db: Session, region: str, query: str, skip: int = 0, limit: int = 20) -> List[int]:
+    """
+    Busca na região usando o índice em memória. O índice é reconstruído quando a
+    assinatura (quantidade, maior id, última atualização) dos produtos da região muda.
+    """
+    region = region.upper()
+    signature = tuple(
+        db.query(func.count(models.Product.id), func.max(models.Product.id), func.max(models.Product.updated_at))
+        .filter(models.Product.region == region)
+        .one()
+    )
+    with _lock:
+        cached = _indexes.get(region)
+        if cached is None or cached[0] != signature:
+            rows = db.query(
+                models.Product.id,
+                models.Product.title,
+                models.Product.brand,
+                models.Product.store_name,
+                models.Product.search_filters,
+            ).filter(models.Product.region == region)
+            cached = (signature, ProductSearchIndex(rows))
+            _indexes[region] = cached
+    return cached[1].search(query, skip=skip, limit=limit)
+
+
+def clear():
+    with _lock:
+        _indexes.clear()
@@ -0,0 +1,9 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, table):
+    """Returns a dialect-specific INSERT that supports ON CONFLICT."""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
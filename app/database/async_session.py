@@ -0,0 +1,40 @@
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.database.pool import engine_options, instrument_engine
+from app.database.session import profile
+
+"""
+Engine e sessões assíncronas, usadas só pela API (FastAPI).
+
+As tarefas do Celery continuam na engine síncrona de app.database.session; este
+módulo não é importado por elas, de forma que os workers não dependem do asyncpg.
+"""
+
+# Driver assíncrono de cada banco
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> URL:
+    """
+    Troca o driver de DATABASE_URL pelo assíncrono equivalente (psycopg2 -> asyncpg).
+    O asyncpg não aceita 'sslmode' na URL: o valor passa para 'ssl'.
+    """
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver for '{parsed.drivername}'; set ASYNC_DATABASE_URL")
+    parsed = parsed.set(drivername=driver)
+    if driver == ASYNC_DRIVERS["postgresql"] and "sslmode" in parsed.query:
+        sslmode = parsed.query["sslmode"]
+        parsed = parsed.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return parsed
+
+
+_url = make_url(settings.ASYNC_DATABASE_URL) if settings.ASYNC_DATABASE_URL else async_database_url(settings.DATABASE_URL)
+
+async_engine = create_async_engine(_url, **engine_options(_url, profile, is_async=True))
+instrument_engine("async", async_engine.sync_engine, profile)
+
+# expire_on_commit=False: objetos lidos continuam acessíveis após o commit, sem lazy load
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
@@ -1,3 +1,4 @@
+import enum
 from sqlalchemy import (
     Column,
     Integer,
@@ -9,14 +10,25 @@ from sqlalchemy import (
     func,
     Numeric,
     Enum,
+    UniqueConstraint,
+    Index,
+    Float,
+    Text,
+    Table,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+class RegionEnum(str, enum.Enum):
+    BR = "BR"
+    US = "US"
+    EU = "EU"
+
 class SearchQuery(Base):
     __tablename__ = "search_queries"
+    __table_args__ = (Index("idx_search_queries_category_region", "category", "region"),)
 
     id = Column(Integer, primary_key=True, index=True)
     query = Column(String(255), nullable=False)
@@ -31,6 +43,7 @@ class SearchQuery(Base):
 
 class Filter(Base):
     __tablename__ = "filters"
+    __table_args__ = (UniqueConstraint("search_query_id", "name"),)
 
     id = Column(Integer, primary_key=True, index=True)
     search_query_id = Column(Integer, ForeignKey("search_queries.id"), nullable=False)
@@ -58,7 +71,138 @@ class Product(Base):
     reviews = Column(Integer)
     variants = Column(JSON)
     other_details = Column(JSON)
+    # Hashes usados pelo sync para pular produtos que não mudaram
+    listing_fingerprint = Column(String(64))
+    content_fingerprint = Column(String(64))
+    # Nomes dos filtros da busca, indexados na busca textual. A coluna search_vector
+    # (tsvector gerado + GIN) existe apenas no Postgres e não é mapeada aqui.
+    search_filters = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    search_query = relationship("SearchQuery", back_populates="products")
\ No newline at end of file
+    search_query = relationship("SearchQuery", back_populates="products")
+    categories = relationship("Category", secondary="product_categories")
+
+    __table_args__ = (
+        # Keyset pagination: listagem por região/categoria ordenada por preço ou atualização
+        Index("idx_products_region_query_price", "region", "search_query_id", "price", "id"),
+        Index("idx_products_region_price", "region", "price", "id"),
+        Index("idx_products_region_updated", "region", updated_at.desc(), id.desc()),
+    )
+
+
+class SyncRun(Base):
+    __tablename__ = "sync_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    region = Column(Enum('BR', 'US', 'EU', name='region_enum', create_type=False), nullable=False)
+    status = Column(String(50), nullable=False, default="running")
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+    duration_seconds = Column(Float)
+    queries_total = Column(Integer, default=0)
+    queries_synced = Column(Integer, default=0)
+    queries_failed = Column(Integer, default=0)
+    products_fetched = Column(Integer, default=0)
+    products_inserted = Column(Integer, default=0)
+    products_updated = Column(Integer, default=0)
+    products_unchanged = Column(Integer, default=0)
+    products_skipped = Column(Integer, default=0)
+    products_failed = Column(Integer, default=0)
+    failures = Column(JSON)
+
+
+class Brand(Base):
+    __tablename__ = "brands"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+
+class Store(Base):
+    __tablename__ = "stores"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), unique=True, nullable=False)
+    logo_url = Column(String)
+
+
+class Category(Base):
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    slug = Column(String(255), unique=True, nullable=False)
+    parent_id = Column(Integer, ForeignKey("categories.id"))
+
+
+class Trend(Base):
+    __tablename__ = "trends"
+    __table_args__ = (
+        UniqueConstraint("name", "region"),
+        Index("idx_trends_region_normalized_name", "region", "normalized_name"),
+        # Top-N por região e por região/categoria (ver trend_scorer)
+        Index("idx_trends_region_rank_key", "region", "score_rank_key"),
+        Index("idx_trends_region_category_rank_key", "region", "category", "score_rank_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    normalized_name = Column(String(255))
+    # Soma das observações com decaimento exponencial, válida em score_updated_at (ver trend_scorer)
+    score = Column(Float, default=0)
+    score_updated_at = Column(DateTime(timezone=True))
+    # Chave de ordenação da pontuação decaída, independente do instante (ver trend_scorer)
+    score_rank_key = Column(Float)
+    region = Column(Enum('BR', 'US', 'EU', name='region_enum', create_type=False), nullable=False)
+    source = Column(String(100))
+    category = Column(String(255))
+    description = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    enriched_at = Column(DateTime(timezone=True))
+    # Quando o enriquecimento foi enfileirado; evita despachos repetidos até ele terminar
+    enrichment_requested_at = Column(DateTime(timezone=True))
+
+    products = relationship("Product", secondary="trend_products")
+
+
+class TrendObservation(Base):
+    """Pontuação de uma tendência vista por uma fonte em uma coleta."""
+    __tablename__ = "trend_observations"
+    __table_args__ = (Index("idx_trend_observations_trend_observed", "trend_id", "observed_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    trend_id = Column(Integer, ForeignKey("trends.id", ondelete="CASCADE"), nullable=False)
+    source = Column(String(100), nullable=False)
+    score = Column(Float, nullable=False)
+    observed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class TrendRanking(Base):
+    """Top-N pré-calculado por região e categoria, reescrito após cada ingestão."""
+    __tablename__ = "trend_rankings"
+
+    region = Column(Enum('BR', 'US', 'EU', name='region_enum', create_type=False), primary_key=True)
+    category = Column(String(255), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    trend_id = Column(Integer, ForeignKey("trends.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+
+    trend = relationship("Trend")
+
+
+# Tabelas de associação
+trend_products = Table(
+    "trend_products",
+    Base.metadata,
+    Column("trend_id", Integer, ForeignKey("trends.id", ondelete="CASCADE"), primary_key=True),
+    Column("product_id", Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+)
+
+product_categories = Table(
+    "product_categories",
+    Base.metadata,
+    Column("product_id", Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+    Column("category_id", Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True),
+)
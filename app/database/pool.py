@@ -0,0 +1,240 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+from uuid import uuid4
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from app.core.config import settings
+
+"""
+Configuração e métricas dos pools de conexão.
+
+Cada processo escolhe um perfil (DATABASE_POOL_PROFILE): 'web' para a API, com
+mais conexões para requisições concorrentes, e 'worker' para o Celery, onde cada
+processo filho executa uma tarefa por vez e poucas conexões bastam. Com muitos
+workers no Supabase, o perfil worker evita esgotar o limite de conexões do banco.
+
+A API tem duas engines: a assíncrona, com o perfil web, atende as leituras, e a
+síncrona usa o perfil de DATABASE_SYNC_POOL_PROFILES (web_sync, 1+2), pois só
+serve marcas, lojas e a exportação. O limite de conexões de cada processo é a
+soma de pool_size + max_overflow das suas engines; o do deploy é esse valor vezes
+o número de processos (workers do gunicorn, processos filhos do Celery).
+
+Os pools registram o tempo de espera no checkout, timeouts, conexões abertas e
+invalidadas; stats() junta esses contadores ao uso atual de cada pool.
+"""
+
+# Valores de um perfil não informados em DATABASE_POOL_PROFILES
+BASE_PROFILE = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+    "pre_ping": "idle",
+    "ping_idle_seconds": 30,
+}
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+def pool_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Perfil de pool `name` (padrão: DATABASE_POOL_PROFILE), completado com BASE_PROFILE
+    e, se for o perfil ativo, com os overrides DATABASE_POOL_SIZE/DATABASE_MAX_OVERFLOW.
+    Levanta ValueError para perfil ou estratégia de pre-ping desconhecidos.
+    """
+    name = name or settings.DATABASE_POOL_PROFILE
+    if name not in settings.DATABASE_POOL_PROFILES and name not in ("web", "worker", "web_sync"):
+        raise ValueError(f"Unknown database pool profile '{name}'")
+    profile = {**BASE_PROFILE, **settings.DATABASE_POOL_PROFILES.get(name, {}), "name": name}
+    if name == settings.DATABASE_POOL_PROFILE:
+        if settings.DATABASE_POOL_SIZE is not None:
+            profile["pool_size"] = settings.DATABASE_POOL_SIZE
+        if settings.DATABASE_MAX_OVERFLOW is not None:
+            profile["max_overflow"] = settings.DATABASE_MAX_OVERFLOW
+    if profile["pre_ping"] not in PRE_PING_STRATEGIES:
+        raise ValueError(f"Unknown pre_ping strategy '{profile['pre_ping']}'")
+    return profile
+
+
+def sync_pool_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """Perfil da engine síncrona em um processo com o perfil `name` (padrão: o ativo)."""
+    name = name or settings.DATABASE_POOL_PROFILE
+    return pool_profile(settings.DATABASE_SYNC_POOL_PROFILES.get(name, name))
+
+
+class PoolMetrics:
+    """Contadores de um pool, atualizados pelos pools Metered* e pelos eventos do engine."""
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._counters = {
+            "checkouts": 0,
+            "checkout_wait_seconds_total": 0.0,
+            "checkout_wait_seconds_max": 0.0,
+            "checkout_timeouts": 0,
+            "connections_opened": 0,
+            "connections_invalidated": 0,
+            "pings": 0,
+        }
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._counters["checkouts"] += 1
+            self._counters["checkout_wait_seconds_total"] += seconds
+            self._counters["checkout_wait_seconds_max"] = max(self._counters["checkout_wait_seconds_max"], seconds)
+
+    def increment(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        checkouts = counters["checkouts"]
+        counters["checkout_wait_ms_avg"] = counters["checkout_wait_seconds_total"] / checkouts * 1000 if checkouts else 0.0
+        counters["checkout_wait_ms_max"] = counters.pop("checkout_wait_seconds_max") * 1000
+        counters.pop("checkout_wait_seconds_total")
+
+        pool = self.engine.pool
+        counters["pool_class"] = type(pool).__name__
+        if isinstance(pool, QueuePool):
+            counters.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            })
+        return counters
+
+
+class _MeteredPool:
+    """Mede o tempo até obter uma conexão (espera na fila ou abertura de uma nova)."""
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics:
+                self.metrics.increment("checkout_timeouts")
+            raise
+        if self.metrics:
+            self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() troca o pool por uma cópia: as métricas continuam as mesmas
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncAdaptedQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+class MeteredNullPool(_MeteredPool, NullPool):
+    pass
+
+
+def transaction_pooler_connect_args(url) -> dict:
+    """
+    Argumentos de conexão para um pooler em modo transação (PgBouncer, Supabase na
+    porta 6543): cada transação pode cair em outra conexão do servidor, então
+    prepared statements nomeados não podem ser reaproveitados.
+    """
+    driver = make_url(url).get_driver_name()
+    if driver == "asyncpg":
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            # Nomes únicos: um nome já usado por outro cliente na mesma conexão do servidor falharia
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    if driver == "psycopg":
+        return {"prepare_threshold": None}
+    # psycopg2 não usa prepared statements no servidor
+    return {}
+
+
+def engine_options(url, profile: Dict[str, Any], is_async: bool = False) -> dict:
+    """
+    Argumentos de create_engine/create_async_engine para o perfil. O SQLite fica
+    com os tamanhos padrão do dialeto (o banco em memória nem usa QueuePool).
+    """
+    url = make_url(url)
+    queue_pool = MeteredAsyncAdaptedQueuePool if is_async else MeteredQueuePool
+    if url.get_backend_name() == "sqlite":
+        if url.database and url.database != ":memory:":
+            return {"poolclass": queue_pool}
+        return {}
+    options = {"pool_pre_ping": profile["pre_ping"] == "always"}
+    if profile["pool_size"] <= 0:
+        options["poolclass"] = MeteredNullPool
+    else:
+        options.update({
+            "poolclass": queue_pool,
+            "pool_size": profile["pool_size"],
+            "max_overflow": profile["max_overflow"],
+            "pool_timeout": profile["pool_timeout"],
+        })
+    options["pool_recycle"] = profile["pool_recycle"]
+    if settings.DATABASE_TRANSACTION_POOLER and url.get_backend_name() == "postgresql":
+        options["connect_args"] = transaction_pooler_connect_args(url)
+    return options
+
+
+_registry: Dict[str, PoolMetrics] = {}
+
+
+def instrument_engine(name: str, engine: Engine, profile: Dict[str, Any]) -> PoolMetrics:
+    """
+    Registra as métricas do pool de `engine` (o sync_engine de uma AsyncEngine) e,
+    com pre_ping 'idle', faz o ping só nas conexões paradas no pool há mais de
+    ping_idle_seconds, em vez de um round trip a cada checkout.
+    """
+    metrics = PoolMetrics(name, engine)
+    if isinstance(engine.pool, _MeteredPool):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def count_connect(dbapi_connection, connection_record):
+        metrics.increment("connections_opened")
+
+    @event.listens_for(engine, "invalidate")
+    def count_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("connections_invalidated")
+
+    if profile["pre_ping"] == "idle":
+        idle_seconds = profile["ping_idle_seconds"]
+
+        @event.listens_for(engine, "checkin")
+        def mark_checkin(dbapi_connection, connection_record):
+            connection_record.info["checked_in_at"] = time.monotonic()
+
+        @event.listens_for(engine, "checkout")
+        def ping_idle(dbapi_connection, connection_record, connection_proxy):
+            checked_in_at = connection_record.info.get("checked_in_at")
+            if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+                return
+            metrics.increment("pings")
+            try:
+                engine.dialect.do_ping(dbapi_connection)
+            except Exception as e:
+                # O pool descarta a conexão e tenta outra
+                raise exc.DisconnectionError(f"Idle connection failed the ping: {e}") from e
+
+    _registry[name] = metrics
+    return metrics
+
+
+def stats() -> dict:
+    """Métricas de todos os pools deste processo: {nome: contadores e uso atual}."""
+    return {name: metrics.stats() for name, metrics in _registry.items()}
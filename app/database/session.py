@@ -1,9 +1,16 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.database.pool import engine_options, instrument_engine, pool_profile, sync_pool_profile
+
+# Perfil do pool deste processo (web na API, worker no Celery)
+profile = pool_profile()
+# Na API a engine síncrona atende pouco tráfego e usa um pool menor (web_sync)
+sync_profile = sync_pool_profile()
 
 # Cria a engine do SQLAlchemy usando a URL do banco de dados das configurações
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL, sync_profile))
+instrument_engine("sync", engine, sync_profile)
 
 # Cria uma fábrica de sessões
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -17,6 +17,9 @@ class ProductBase(BaseModel):
 
 class ProductCreate(ProductBase):
     search_query_id: int
+    region: str
+    listing_fingerprint: Optional[str] = None
+    content_fingerprint: Optional[str] = None
 
 class Product(ProductBase):
     id: int
@@ -25,6 +28,23 @@ class Product(ProductBase):
     class Config:
         orm_mode = True
 
+class ProductListItem(BaseModel):
+    """Product without the variants/other_details JSON, used by list endpoints."""
+    id: int
+    google_product_id: str
+    search_query_id: int
+    title: str
+    brand: Optional[str] = None
+    price: Optional[float] = None
+    thumbnail_url: Optional[str] = None
+    store_name: Optional[str] = None
+    store_link: str
+    rating: Optional[float] = None
+    reviews: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
 # Schemas for Filter
 class FilterBase(BaseModel):
     name: str
@@ -40,6 +60,35 @@ class Filter(FilterBase):
     class Config:
         orm_mode = True
 
+# Schemas for Trend
+class TrendBase(BaseModel):
+    name: str
+    score: float = 0
+    region: str
+    source: Optional[str] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
+
+class TrendCreate(TrendBase):
+    normalized_name: Optional[str] = None
+
+class Trend(TrendBase):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+class RankedTrend(BaseModel):
+    rank: int
+    score: float
+    trend: Trend
+
+    class Config:
+        orm_mode = True
+
+class TrendDetail(Trend):
+    products: List[ProductListItem] = []
+
 # Schemas for SearchQuery
 class SearchQueryBase(BaseModel):
     query: str
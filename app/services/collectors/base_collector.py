@@ -1,9 +1,31 @@
+import asyncio
 from abc import ABC, abstractmethod
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, List
+
+# Quantidade de registros lidos por vez ao consumir um coletor no modo assíncrono
+ASYNC_CHUNK_SIZE = 500
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    """Agrupa um iterável em listas de até `size` itens, sem materializá-lo por inteiro."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
 
 class BaseCollector(ABC):
     """
     Classe base abstrata para todos os coletores de dados.
     Define a interface que todos os coletores devem seguir.
+
+    Além de `collect`, que devolve a lista completa, os coletores podem ser consumidos
+    em modo streaming com `iter_collect` / `aiter_collect`, que produzem registros de
+    tendência normalizados ({'name', 'region', 'source', 'category', 'score'}) um a um,
+    no formato esperado por TrendProcessor.process.
     """
     @abstractmethod
     def collect(self, region: str):
@@ -14,3 +36,24 @@ class BaseCollector(ABC):
         :param region: O código da região (ex: 'BR', 'US') para a coleta.
         """
         pass
+
+    def iter_collect(self, *args, **kwargs) -> Iterator[dict]:
+        """
+        Produz os registros normalizados de forma preguiçosa.
+        A implementação padrão apenas percorre o resultado de `collect`; coletores que
+        leem fontes grandes devem sobrescrevê-la para manter o uso de memória constante.
+        """
+        yield from self.collect(*args, **kwargs)
+
+    async def aiter_collect(self, *args, **kwargs) -> AsyncIterator[dict]:
+        """
+        Versão assíncrona de `iter_collect`. A leitura roda em uma thread, em blocos de
+        ASYNC_CHUNK_SIZE registros, para não bloquear o event loop.
+        """
+        iterator = self.iter_collect(*args, **kwargs)
+        while True:
+            chunk = await asyncio.to_thread(lambda: list(islice(iterator, ASYNC_CHUNK_SIZE)))
+            if not chunk:
+                return
+            for record in chunk:
+                yield record
@@ -1,5 +1,7 @@
 from pytrends.request import TrendReq
+from pytrends.exceptions import TooManyRequestsError
 import pandas as pd
+from app.core.rate_limit import RateLimitedError, rate_limiter
 from .base_collector import BaseCollector
 
 class GoogleTrendsCollector(BaseCollector):
@@ -19,8 +21,11 @@ class GoogleTrendsCollector(BaseCollector):
 
         :param region: O código do país de duas letras (ex: 'US', 'BR').
         :return: Um dicionário com os termos em ascensão ou uma mensagem de erro.
+        :raises RateLimitedError: quando o Google Trends limita as requisições (HTTP 429).
         """
         print(f"Iniciando coleta de Google Trends para a região: {region.upper()}")
+        # Cada coleta faz duas chamadas ao Google Trends (payload + related queries): um token por chamada
+        rate_limiter.acquire("google_trends", tokens=2)
         try:
             # Busca as "rising queries" para a categoria de moda
             self.pytrends.build_payload(
@@ -41,10 +46,31 @@ class GoogleTrendsCollector(BaseCollector):
                 print("Nenhuma tendência em ascensão encontrada para esta região/categoria.")
                 return {"message": "No rising trends found."}
 
+        except TooManyRequestsError as e:
+            # Sobe o erro para quem chamou retentar mais tarde, em vez de perder a coleta
+            raise RateLimitedError("google_trends") from e
         except Exception as e:
             print(f"Ocorreu um erro ao coletar dados do Google Trends: {e}")
             return {"error": str(e)}
 
+    def iter_collect(self, region: str = 'US'):
+        """
+        Produz as "rising queries" como registros de tendência normalizados.
+        O Google Trends devolve a lista inteira de uma vez; o streaming aqui serve para
+        que o coletor possa ser consumido pela mesma interface dos demais.
+        """
+        rising_queries = self.collect(region=region)
+        if not isinstance(rising_queries, list):
+            return
+        for row in rising_queries:
+            yield {
+                'name': row.get('query'),
+                'region': region.upper(),
+                'source': 'google_trends',
+                'category': 'FASHION',
+                'score': row.get('value', 0),
+            }
+
 # Exemplo de como usar (para teste)
 if __name__ == '__main__':
     collector = GoogleTrendsCollector()
@@ -1,47 +1,78 @@
 import os
 import re
+from functools import lru_cache
+from typing import Iterable, List, Optional, Pattern, Tuple
 from bs4 import BeautifulSoup
-from .base_collector import BaseCollector
+from app.core.config import settings
+from app.services.processing.brand_matcher import trie_pattern
+from .base_collector import BaseCollector, batched
+
+# Lista padrão de marcas e termos removidos das descrições (sobrescrita por SHEIN_BRANDS_TO_REMOVE)
+DEFAULT_BRANDS_TO_REMOVE = (
+    'SHEIN', 'DAZY', 'EMERY ROSE', 'ROMWE', 'MOTF', 'BIZCHIC', 'MUSERA',
+    'Coolane', 'Anewsta', 'Firerie', 'Calvaya', 'Livesso', 'Poéselle',
+    'Ontre', 'Maija', 'Attitoon', 'Mulvari', 'Sollinarry', 'Flirla',
+    'RosyDaze', 'COSMINA', 'Elenzga', 'Breezaya', 'INAWLY', 'Aveloria',
+    'Sweetra', 'Siren Gaze', 'LUNE', 'BAE', 'EZwear', 'Clasi',
+    'PETITE', 'ICON', 'MOD', 'Frenchy', 'Unity', 'Swim', 'Essnce'
+)
+
+# Linhas limpas de uma vez por `clean_descriptions` durante a leitura do arquivo
+CLEAN_BATCH_SIZE = 1000
+
+
+@lru_cache(maxsize=16)
+def compile_brand_pattern(brands: Tuple[str, ...]) -> Pattern:
+    """
+    Compila o padrão que encontra qualquer uma das marcas como palavra inteira, de forma
+    case-insensitive, incluindo colaborações como "SHEIN x Artist". As marcas viram uma
+    trie de prefixos e a colaboração não atravessa quebras de linha, para que o padrão
+    possa rodar sobre um lote inteiro.
+    """
+    words = {brand.lower() for brand in brands}
+    # O lookahead descarta rápido as posições que não começam com a inicial de nenhuma marca
+    initials = re.escape(''.join(sorted({word[0] for word in words})))
+    return re.compile(
+        r'\b(?=[' + initials + r'])(' + trie_pattern(words) + r')([^\S\n]*x[^\S\n]*[A-Za-z]+)?\b',
+        re.IGNORECASE
+    )
+
 
 class SheinCollector(BaseCollector):
     """
     Coleta dados de tendências da Shein a partir de arquivos locais.
     """
-    def __init__(self):
+    def __init__(self, brands_to_remove: Optional[Iterable[str]] = None):
         self.html_files = {
             'BR': 'shein_br.html',
             'EU': 'shein_eu.html',
             'US': 'shein_us.html'
         }
         self.base_path = "/Users/mymac/trend-engine/app/services/collectors/manual_html"
+        brands = tuple(brands_to_remove or settings.SHEIN_BRANDS_TO_REMOVE or DEFAULT_BRANDS_TO_REMOVE)
+        self.brand_pattern = compile_brand_pattern(brands)
 
     def _clean_description(self, description: str) -> str:
         """
         Remove marcas e palavras-chave de marketing das descrições dos produtos.
         """
-        # Lista de marcas e termos a serem removidos
-        brands_to_remove = [
-            'SHEIN', 'DAZY', 'EMERY ROSE', 'ROMWE', 'MOTF', 'BIZCHIC', 'MUSERA',
-            'Coolane', 'Anewsta', 'Firerie', 'Calvaya', 'Livesso', 'Poéselle',
-            'Ontre', 'Maija', 'Attitoon', 'Mulvari', 'Sollinarry', 'Flirla',
-            'RosyDaze', 'COSMINA', 'Elenzga', 'Breezaya', 'INAWLY', 'Aveloria',
-            'Sweetra', 'Siren Gaze', 'LUNE', 'BAE', 'EZwear', 'Clasi',
-            'PETITE', 'ICON', 'MOD', 'Frenchy', 'Unity', 'Swim', 'Essnce'
-        ]
-        # Constrói um padrão regex para encontrar qualquer uma dessas marcas como palavras inteiras
-        # e de forma case-insensitive, incluindo colaborações como "SHEIN x Artist"
-        pattern = r'\b(' + '|'.join(brands_to_remove) + r')(\s*x\s*[A-Za-z]+)?\b'
-        
         # Remove as marcas da descrição
-        cleaned_desc = re.sub(pattern, '', description, flags=re.IGNORECASE)
-        
-        # Remove hífens no início e espaços em branco extras
-        cleaned_desc = cleaned_desc.lstrip(' -').strip()
-        
-        # Remove múltiplos espaços por um único espaço
-        cleaned_desc = re.sub(r'\s+', ' ', cleaned_desc)
-        
-        return cleaned_desc
+        cleaned_desc = self.brand_pattern.sub('', description.replace('\n', ' '))
+
+        # Remove hífens no início e reduz espaços em branco extras a um único espaço
+        return ' '.join(cleaned_desc.lstrip(' -').split())
+
+    def clean_descriptions(self, descriptions: Iterable[str]) -> List[str]:
+        """
+        Versão em lote de `_clean_description`: junta as descrições em um único texto e
+        aplica a regex de marcas uma vez sobre ele, em vez de uma vez por linha. O
+        resultado é idêntico ao de chamar `_clean_description` em cada descrição.
+        """
+        descriptions = [description.replace('\n', ' ') for description in descriptions]
+        if not descriptions:
+            return []
+        text = self.brand_pattern.sub('', '\n'.join(descriptions))
+        return [' '.join(line.lstrip(' -').split()) for line in text.split('\n')]
 
     def collect(self, region: str = 'BR'):
         """
@@ -50,35 +81,49 @@ class SheinCollector(BaseCollector):
         :param region: O código da região (BR, EU, US).
         :return: Uma lista de nomes de tendências limpos.
         """
+        return [record['name'] for record in self.iter_collect(region)]
+
+    def iter_collect(self, region: str = 'BR'):
+        """
+        Lê o arquivo da região linha a linha e produz um registro de tendência normalizado
+        por descrição, sem carregar o arquivo inteiro na memória.
+
+        :param region: O código da região (BR, EU, US).
+        """
         region_upper = region.upper()
         file_name = self.html_files.get(region_upper)
         
         if not file_name:
             print(f"Região '{region}' não suportada para Shein.")
-            return []
+            return
 
         file_path = os.path.join(self.base_path, file_name)
         print(f"Iniciando coleta de Shein para a região: {region_upper} a partir do arquivo: {file_path}")
 
         if region_upper == 'US':
             print("Coleta para os EUA não é suportada pois o conteúdo é dinâmico e não pode ser lido do arquivo HTML estático.")
-            return []
+            return
 
+        count = 0
         try:
             with open(file_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
+                lines = (line for line in f if line.strip())
+                for batch in batched(lines, CLEAN_BATCH_SIZE):
+                    for name in self.clean_descriptions(batch):
+                        count += 1
+                        yield {
+                            'name': name,
+                            'region': region_upper,
+                            'source': 'shein',
+                            'category': 'GENERAL',
+                        }
 
-            trends = [self._clean_description(line) for line in lines if line.strip()]
-
-            print(f"Encontradas {len(trends)} tendências na Shein para a região {region_upper}.")
-            return trends
+            print(f"Encontradas {count} tendências na Shein para a região {region_upper}.")
 
         except FileNotFoundError:
             print(f"Arquivo não encontrado para a região {region_upper}: {file_path}")
-            return []
         except Exception as e:
             print(f"Ocorreu um erro ao processar o arquivo da Shein para a região {region_upper}: {e}")
-            return []
 
 if __name__ == '__main__':
     collector = SheinCollector()
@@ -11,6 +11,8 @@ class TikTokCollector(BaseCollector):
             'BEAUTY_PERSONAL_CARE': 'br_beauty_personal_care.txt',
             'APPAREL_ACCESSORIES': 'br_apparel_accessories.txt'
         }
+        # Os arquivos de hashtags disponíveis são todos do TikTok Brasil
+        self.region = 'BR'
 
     def collect(self, category: str):
         """
@@ -19,29 +21,46 @@ class TikTokCollector(BaseCollector):
         :param category: A categoria de interesse (BEAUTY_PERSONAL_CARE, APPAREL_ACCESSORIES).
         :return: Uma lista de hashtags.
         """
+        return [record['name'] for record in self.iter_collect(category)]
+
+    def iter_collect(self, category: str):
+        """
+        Lê o arquivo da categoria linha a linha e produz um registro de tendência
+        normalizado por hashtag, sem carregar o arquivo inteiro na memória.
+
+        :param category: A categoria de interesse (BEAUTY_PERSONAL_CARE, APPAREL_ACCESSORIES).
+        """
         category_upper = category.upper()
         file_name = self.category_files.get(category_upper)
 
         if not file_name:
             print(f"Categoria '{category}' não suportada para TikTok.")
-            return []
+            return
 
         file_path = os.path.join(self.base_path, file_name)
         print(f"Iniciando coleta de TikTok para a categoria: {category_upper} a partir do arquivo: {file_path}")
 
+        count = 0
         try:
             with open(file_path, "r", encoding="utf-8") as f:
-                trends = [line.strip() for line in f.readlines() if line.strip()]
+                for line in f:
+                    hashtag = line.strip()
+                    if not hashtag:
+                        continue
+                    count += 1
+                    yield {
+                        'name': hashtag,
+                        'region': self.region,
+                        'source': 'tiktok',
+                        'category': category_upper,
+                    }
 
-            print(f"Encontradas {len(trends)} tendências no TikTok para a categoria {category_upper}.")
-            return trends
+            print(f"Encontradas {count} tendências no TikTok para a categoria {category_upper}.")
 
         except FileNotFoundError:
             print(f"Arquivo de hashtags não encontrado para a categoria {category_upper}: {file_path}")
-            return []
         except Exception as e:
             print(f"Ocorreu um erro ao processar o arquivo do TikTok para a categoria {category_upper}: {e}")
-            return []
 
 if __name__ == '__main__':
     collector = TikTokCollector()
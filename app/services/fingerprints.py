@@ -0,0 +1,32 @@
+import hashlib
+import json
+from app.schemas import trend as catalog_schema
+
+"""
+Fingerprints de conteúdo para detectar produtos que não mudaram entre syncs.
+"""
+
+# Campos de um resultado do Google Shopping que indicam mudança no produto.
+# O pageToken e a posição mudam a cada busca e por isso ficam de fora.
+LISTING_FIELDS = ("productId", "title", "price", "extractedPrice", "source", "rating", "reviews", "delivery")
+
+# Campos do ProductCreate que não fazem parte do conteúdo do produto
+NON_CONTENT_FIELDS = {"listing_fingerprint", "content_fingerprint"}
+
+
+def _digest(data) -> str:
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def listing_fingerprint(shopping_result: dict) -> str:
+    """Hash of the shopping-result fields that change when the product changes."""
+    return _digest({field: shopping_result.get(field) for field in LISTING_FIELDS})
+
+
+def content_fingerprint(product: catalog_schema.ProductCreate) -> str:
+    """
+    Hash of everything stored for a product: price, store link, rating, reviews,
+    variants, offers and the descriptive fields.
+    """
+    return _digest(product.model_dump(exclude=NON_CONTENT_FIELDS))
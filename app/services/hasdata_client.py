@@ -0,0 +1,135 @@
+import asyncio
+from typing import List, Optional
+import httpx
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.rate_limit import ProviderUnavailableError, RateLimitedError, parse_retry_after, rate_limiter
+
+# Mapping for region-specific parameters for the Hasdata API
+REGION_PARAMS = {
+    "BR": {"location": "Brazil", "gl": "br", "hl": "pt-br"},
+    "US": {"location": "United States", "gl": "us", "hl": "en"},
+    "EU": {"location": "Germany", "gl": "de", "hl": "de"}, # Using Germany as a proxy for EU
+}
+
+
+class HasdataClient:
+    """
+    Async client for the Hasdata Google APIs.
+    Keeps a pooled keep-alive connection set and limits the number of requests in flight.
+    Calls go through the shared "hasdata" rate limit. Rate limiting (429) raises
+    RateLimitedError and transient failures raise ProviderUnavailableError, so Celery
+    tasks can retry them; other client errors are logged and return {}.
+
+    Usage:
+        async with HasdataClient() as client:
+            details = await client.get_many_immersive_details(tokens)
+    """
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_in_flight: Optional[int] = None,
+        timeout: Optional[float] = None,
+        keepalive: Optional[float] = None,
+    ):
+        self.api_key = api_key if api_key is not None else settings.HASDATA_API_KEY
+        self.base_url = base_url or settings.HASDATA_API_URL
+        self.max_in_flight = max_in_flight or settings.HASDATA_MAX_IN_FLIGHT
+        self.timeout = timeout or settings.HASDATA_TIMEOUT_SECONDS
+        self.keepalive = keepalive or settings.HASDATA_KEEPALIVE_SECONDS
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Content-Type": "application/json",
+                "x-api-key": self.api_key or "",
+            },
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_in_flight,
+                max_keepalive_connections=self.max_in_flight,
+                keepalive_expiry=self.keepalive,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._client.aclose()
+        self._client = None
+
+    async def _get(self, path: str, params: dict, api_name: str, cache_endpoint: str, region: Optional[str] = None) -> dict:
+        if not self.api_key:
+            print("Error: HASDATA_API_KEY not configured.")
+            return {}
+
+        cached = await response_cache.get_async(cache_endpoint, params=params, region=region)
+        if cached is not None:
+            return cached
+
+        async with self._semaphore:
+            await rate_limiter.acquire_async("hasdata")
+            try:
+                response = await self._client.get(path, params=params)
+            except httpx.TransportError as e:
+                raise ProviderUnavailableError("hasdata", f"{api_name}: {e!r}")
+
+        if response.status_code == 429:
+            raise RateLimitedError("hasdata", retry_after=parse_retry_after(response.headers.get("Retry-After")))
+        if response.status_code >= 500:
+            raise ProviderUnavailableError("hasdata", f"{api_name}: HTTP {response.status_code}")
+        try:
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Error calling Hasdata {api_name} API: {e}")
+            return {}
+
+        if data:
+            await response_cache.set_async(cache_endpoint, data, params=params, region=region)
+        return data
+
+    async def get_shopping_results(self, query: str, region: str = "BR") -> dict:
+        """
+        Calls the Hasdata Google Shopping API for a specific region.
+        """
+        region_upper = region.upper()
+        if region_upper not in REGION_PARAMS:
+            print(f"Error: Region '{region}' not supported.")
+            return {}
+
+        params = {
+            "q": query,
+            "deviceType": "desktop",
+            **REGION_PARAMS[region_upper]
+        }
+        print(f"Calling Hasdata Shopping API for query='{query}' in region='{region_upper}'")
+        return await self._get(
+            "/shopping", params, api_name="Shopping", cache_endpoint="hasdata_shopping", region=region_upper
+        )
+
+    async def get_immersive_details(self, page_token: str) -> dict:
+        """
+        Calls the Hasdata Google Immersive Product API.
+        """
+        return await self._get(
+            "/immersive-product",
+            {"pageToken": page_token},
+            api_name="Immersive Product",
+            cache_endpoint="hasdata_immersive_product",
+        )
+
+    async def get_many_immersive_details(self, page_tokens: List[str], return_exceptions: bool = False) -> List[dict]:
+        """
+        Fetches immersive details for several products concurrently, bounded by max_in_flight.
+        Results are returned in the same order as the tokens. With return_exceptions, a failed
+        lookup yields its exception instead of cancelling the others.
+        """
+        return await asyncio.gather(
+            *(self.get_immersive_details(token) for token in page_tokens),
+            return_exceptions=return_exceptions,
+        )
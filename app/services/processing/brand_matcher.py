@@ -0,0 +1,106 @@
+import re
+import threading
+import time
+import unicodedata
+from typing import Iterable, Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud import crud_brands
+from app.database.session import SessionLocal
+
+"""
+Identifica marcas nos títulos dos produtos.
+
+As marcas vêm da tabela 'brands' e são compiladas uma única vez por worker em uma
+regex em formato de trie, com fronteira de palavra e sem diferenciar acentos ou
+maiúsculas. O matcher é reconstruído quando a tabela muda.
+"""
+
+
+def fold_text(text: str) -> str:
+    """Remove acentos e normaliza maiúsculas/minúsculas (ex: 'Poéselle' -> 'poeselle')."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Compila uma lista de palavras em uma regex com prefixos fatorados, ex:
+    ['farm', 'farfetch'] -> 'far(?:m|fetch)'. O custo da busca cresce com o tamanho
+    do título, e não com o número de marcas.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        # Prefers the longest alternative; the word-boundary check backtracks to shorter ones
+        branches.sort(key=len, reverse=True)
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if is_end else body
+
+    return build(trie)
+
+
+class BrandMatcher:
+    """
+    Encontra a primeira marca conhecida em um título.
+    """
+    def __init__(self, brand_names: Iterable[str]):
+        self.brand_names = {}
+        for name in brand_names:
+            folded = fold_text(name).strip()
+            if folded:
+                self.brand_names.setdefault(folded, name)
+        self.pattern = None
+        if self.brand_names:
+            self.pattern = re.compile(r"(?<!\w)(" + trie_pattern(self.brand_names) + r")(?!\w)")
+
+    def match_name(self, title: str) -> Optional[str]:
+        """Retorna o nome cadastrado da primeira marca encontrada no título, ou None."""
+        if not self.pattern or not title:
+            return None
+        match = self.pattern.search(fold_text(title))
+        return self.brand_names[match.group(1)] if match else None
+
+
+_matcher: Optional[BrandMatcher] = None
+_signature = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_brand_matcher(db: Session, seed_brands: Iterable[str] = ()) -> BrandMatcher:
+    """
+    Retorna o matcher deste worker, construindo-o na primeira chamada.
+    A cada BRAND_MATCHER_REFRESH_SECONDS verifica (com uma única query) se a tabela
+    de marcas mudou e, nesse caso, reconstrói o matcher.
+    """
+    global _matcher, _signature, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if _matcher is not None and now - _checked_at < settings.BRAND_MATCHER_REFRESH_SECONDS:
+            return _matcher
+
+        if _matcher is None and seed_brands:
+            # Sessão própria: o commit das marcas não leva junto o trabalho pendente de `db`
+            with SessionLocal() as seed_db:
+                crud_brands.ensure_brands(seed_db, seed_brands)
+                seed_db.commit()
+
+        signature = crud_brands.get_brands_signature(db)
+        if _matcher is None or signature != _signature:
+            _matcher = BrandMatcher(crud_brands.get_brand_names(db))
+            _signature = signature
+            print(f"Matcher de marcas construído com {len(_matcher.brand_names)} marcas.")
+        _checked_at = now
+        return _matcher
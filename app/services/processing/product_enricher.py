@@ -1,11 +1,16 @@
 import os
+import re
+import hashlib
 import requests
 import json
 from typing import Optional
 from sqlalchemy.orm import Session
+from app.core.cache import response_cache
 from app.core.config import settings
+from app.core.rate_limit import ProviderUnavailableError, RateLimitedError, parse_retry_after, rate_limiter
 from app.database import models
-from app.crud import crud_stores, crud_brands, crud_products, crud_trends
+from app.crud import crud_products, crud_stores, crud_trends, lookup_cache
+from .brand_matcher import get_brand_matcher
 
 # Mapeamento de regiões para parâmetros da API do Serper
 REGION_PARAMS = {
@@ -14,13 +19,47 @@ REGION_PARAMS = {
     "EU": {"gl": "de", "hl": "de", "google_domain": "google.de"},
 }
 
-# Lista inicial de marcas para procurar nos títulos dos produtos.
-# O ideal é que isso venha do banco de dados no futuro.
+# Marcas garantidas na tabela 'brands' na primeira carga do matcher.
+# As demais marcas são cadastradas diretamente no banco.
 KNOWN_BRANDS = [
     "Nike", "Adidas", "Shein", "Renner", "C&A", "Zara", "Hering", "Moleca", 
     "Vizzano", "Dakota", "Colcci", "Farm", "Schutz", "Arezzo", "Melissa"
 ]
 
+_PRICE_NUMBER = re.compile(r"\d[\d.,]*")
+
+
+def parse_price(value) -> Optional[float]:
+    """
+    Converte o preço do Serper ("R$ 1.299,90", "$49.99", "1,299.00 €") em número.
+    O último separador seguido de 1 ou 2 dígitos é o decimal; os demais são de milhar.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _PRICE_NUMBER.search(value or "")
+    if not match:
+        return None
+    number = match.group().rstrip(".,")
+    separator = max(number.rfind(","), number.rfind("."))
+    if separator != -1 and len(number) - separator - 1 in (1, 2):
+        integer, decimals = number[:separator], number[separator + 1:]
+        return float(re.sub(r"[.,]", "", integer) + "." + decimals)
+    return float(re.sub(r"[.,]", "", number))
+
+
+def serper_product_id(product_data: dict) -> Optional[str]:
+    """
+    Id do produto no Google Shopping, o mesmo google_product_id do catálogo. Sem ele,
+    usa um hash do link da oferta.
+    """
+    if product_data.get('productId'):
+        return str(product_data['productId'])
+    link = product_data.get('link')
+    if not link:
+        return None
+    return "serper-" + hashlib.sha1(link.encode("utf-8")).hexdigest()
+
+
 class ProductEnricher:
     """
     Busca produtos para uma tendência, os enriquece com marca/categoria e os salva no banco.
@@ -41,24 +80,40 @@ class ProductEnricher:
 
         url = "https://google.serper.dev/shopping"
         params = REGION_PARAMS[region.upper()]
-        payload = json.dumps({"q": query, "num": limit, **params})
+        request_params = {"q": query, "num": limit}
+
+        cached = response_cache.get("serper_shopping", params=request_params, region=region)
+        if cached is not None:
+            return cached
+
+        payload = json.dumps({**request_params, **params})
         headers = {'X-API-KEY': self.serper_api_key, 'Content-Type': 'application/json'}
 
+        rate_limiter.acquire("serper")
+        try:
+            response = requests.post(url, headers=headers, data=payload, timeout=30)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            raise ProviderUnavailableError("serper", repr(e))
+
+        # Limite de taxa e falhas temporárias sobem para a tarefa do Celery retentar
+        if response.status_code == 429:
+            raise RateLimitedError("serper", retry_after=parse_retry_after(response.headers.get("Retry-After")))
+        if response.status_code >= 500:
+            raise ProviderUnavailableError("serper", f"HTTP {response.status_code}")
         try:
-            response = requests.post(url, headers=headers, data=payload)
             response.raise_for_status()
-            return response.json().get("shopping", [])
-        except requests.exceptions.RequestException as e:
+            products = response.json().get("shopping", [])
+        except (requests.exceptions.RequestException, ValueError) as e:
             print(f"Erro ao chamar a API do Serper: {e}")
             return []
 
-    def _extract_brand_id(self, product_title: str) -> Optional[int]:
+        if products:
+            response_cache.set("serper_shopping", products, params=request_params, region=region)
+        return products
+
+    def _extract_brand(self, product_title: str) -> Optional[str]:
         """Extrai uma marca conhecida do título de um produto."""
-        for brand_name in KNOWN_BRANDS:
-            if brand_name.lower() in product_title.lower():
-                brand = crud_brands.get_or_create_brand(self.db, brand_name=brand_name)
-                return brand.id
-        return None
+        return get_brand_matcher(self.db, seed_brands=KNOWN_BRANDS).match_name(product_title)
 
     def enrich(self, trend: models.Trend):
         """Enriquece uma tendência com produtos, incluindo loja, marca e categoria."""
@@ -70,37 +125,43 @@ class ProductEnricher:
             return
 
         # Busca a categoria da tendência para associar aos produtos
-        category = self.db.query(models.Category).filter(models.Category.slug == trend.category).first()
-        category_id = category.id if category else None
+        category_id = lookup_cache.get_category_id(self.db, slug=trend.category)
         if not category_id:
             print(f"Alerta: Categoria '{trend.category}' não encontrada no banco. Os produtos não serão categorizados.")
 
         print(f"{len(products)} produtos encontrados. Salvando no banco...")
-        saved_count = 0
+        products_to_save = []
         for product_data in products:
             store_name = product_data.get('source')
             product_title = product_data.get('title', '')
-            if not store_name or not product_title:
+            if not store_name or not product_title or not product_data.get('link'):
                 continue
 
-            # 1. Garante que a loja exista
-            store = crud_stores.get_or_create_store(self.db, store_name=store_name)
-
-            # 2. Extrai a marca do título do produto
-            brand_id = self._extract_brand_id(product_title)
-
-            # 3. Cria o produto e associações
-            crud_products.create_product(
-                self.db,
-                product_data=product_data,
-                store_id=store.id,
-                trend_id=trend.id,
-                brand_id=brand_id,
-                category_id=category_id
-            )
-            saved_count += 1
-        
-        print(f"{saved_count} produtos salvos e associados à tendência '{trend.name}'.")
+            # 1. Mapeia o resultado do Serper para as colunas do produto, com a marca extraída do título
+            products_to_save.append({
+                "google_product_id": serper_product_id(product_data),
+                "title": product_title,
+                "price": parse_price(product_data.get('price')),
+                "thumbnail_url": product_data.get('imageUrl'),
+                "store_name": store_name,
+                "store_link": product_data['link'],
+                "brand": self._extract_brand(product_title),
+                "rating": product_data.get('rating'),
+                "reviews": product_data.get('ratingCount'),
+            })
+
+        # 2. Garante que as lojas existam, com um único INSERT
+        crud_stores.ensure_stores(self.db, (product['store_name'] for product in products_to_save))
+
+        # 3. Cria os produtos e as associações em uma única transação
+        product_ids = crud_products.create_products_bulk(
+            self.db,
+            products_data=products_to_save,
+            trend=trend,
+            category_id=category_id,
+        )
+
+        print(f"{len(product_ids)} produtos salvos e associados à tendência '{trend.name}'.")
 
 # --- Bloco de Teste ---
 if __name__ == '__main__':
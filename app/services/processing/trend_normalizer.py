@@ -0,0 +1,217 @@
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from app.core.config import settings
+from .brand_matcher import fold_text
+
+"""
+Normaliza e agrupa tendências quase duplicadas antes do TrendProcessor.
+
+Descrições da Shein, hashtags do TikTok e buscas do Google Trends costumam descrever a
+mesma tendência com maiúsculas, acentos, hashtags e ordem de palavras diferentes
+("#VestidoFloral", "vestido floral", "Floral Vestido"). Cada nome é reduzido a uma
+chave de conjunto de tokens; nomes com a mesma chave são a mesma tendência, e chaves
+parecidas ("vestido floral" / "vestidos florais") são agrupadas via MinHash + LSH
+com confirmação pela similaridade de Jaccard dos trigramas. Cada grupo vira um único
+registro, com as pontuações das fontes combinadas, e é enriquecido uma única vez.
+"""
+
+# Palavras sem valor para identificar a tendência (pt/en/de)
+STOPWORDS = frozenset({
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'com', 'para', 'por', 'no', 'na',
+    'the', 'and', 'of', 'for', 'with', 'in', 'on',
+    'der', 'die', 'das', 'und', 'mit', 'fur', 'im',
+})
+
+# Sufixos de plural testados em ordem (o mais longo primeiro); o padrão é remover o 's'
+_PLURAL_SUFFIXES = (
+    ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'), ('uis', 'ul'),
+    ('ies', 'y'), ('sses', 'ss'), ('shes', 'sh'), ('ches', 'ch'), ('xes', 'x'),
+)
+
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 61) - 1
+_CAMEL_CASE = re.compile(r'(?<=[a-z])(?=[A-Z])')
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_trend_name(name: str) -> str:
+    """
+    Normaliza um nome de tendência: separa hashtags em camelCase, remove acentos,
+    maiúsculas e pontuação. Ex: '#VestidoFloral' -> 'vestido floral'.
+    """
+    name = _CAMEL_CASE.sub(' ', name.replace('#', ' '))
+    return ' '.join(_NON_ALNUM.sub(' ', fold_text(name)).split())
+
+
+def singularize(token: str) -> str:
+    """Reduz plurais comuns do português e do inglês ('florais' -> 'floral', 'dresses' -> 'dress')."""
+    if len(token) <= 3 or not token.endswith('s') or token.endswith('ss'):
+        return token
+    for suffix, replacement in _PLURAL_SUFFIXES:
+        if token.endswith(suffix):
+            return token[:-len(suffix)] + replacement
+    # Singulares terminados em 'is'/'us' ('tenis', 'bonus')
+    if token.endswith(('is', 'us')):
+        return token
+    return token[:-1]
+
+
+def trend_key(name: str) -> str:
+    """
+    Chave de conjunto de tokens: tokens normalizados e no singular, sem stopwords,
+    únicos e ordenados. Ex: 'Floral - Vestidos de Festa' -> 'festa floral vestido'.
+    """
+    tokens = normalize_trend_name(name).split()
+    meaningful = {singularize(token) for token in tokens if token not in STOPWORDS}
+    return ' '.join(sorted(meaningful or set(tokens)))
+
+
+def shingles(key: str, size: int = SHINGLE_SIZE) -> FrozenSet[str]:
+    """Trigramas de caracteres da chave, tolerantes a plural, erros de digitação e hifenização."""
+    if len(key) <= size:
+        return frozenset([key])
+    return frozenset(key[i:i + size] for i in range(len(key) - size + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    Assinaturas MinHash com `num_perm` funções de hash universais (a*x + b mod p). Os
+    hashes são estáveis entre processos (crc32), ao contrário do hash() do Python.
+    """
+    def __init__(self, num_perm: int, seed: int = 1):
+        state = seed
+        self.coefficients = []
+        for _ in range(num_perm):
+            # Gerador congruencial simples: coeficientes determinísticos a partir da seed
+            state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+            a = state % (_MERSENNE_PRIME - 1) + 1
+            state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+            self.coefficients.append((a, state % _MERSENNE_PRIME))
+
+    def signature(self, items: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(item.encode('utf-8')) for item in items]
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in self.coefficients
+        )
+
+
+class _DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def _cluster_keys(keys: List[str], similarity: float, hasher: MinHasher, bands: int) -> _DisjointSet:
+    """Agrupa chaves distintas cuja similaridade de Jaccard dos trigramas atinge `similarity`."""
+    clusters = _DisjointSet(len(keys))
+    key_shingles = [shingles(key) for key in keys]
+    rows = max(1, len(hasher.coefficients) // bands)
+    buckets = defaultdict(list)
+    for index, items in enumerate(key_shingles):
+        signature = hasher.signature(items)
+        for band in range(bands):
+            buckets[(band, signature[band * rows:(band + 1) * rows])].append(index)
+
+    checked = set()
+    for candidates in buckets.values():
+        for position, i in enumerate(candidates):
+            for j in candidates[position + 1:]:
+                if (i, j) in checked or clusters.find(i) == clusters.find(j):
+                    continue
+                checked.add((i, j))
+                if jaccard(key_shingles[i], key_shingles[j]) >= similarity:
+                    clusters.union(i, j)
+    return clusters
+
+
+def _merge_cluster(records: List[dict]) -> dict:
+    """
+    Combina os registros de um grupo. A categoria vem do registro de maior pontuação e
+    o nome é o mais legível (sem hashtag, mais frequente, de maior pontuação); a
+    pontuação é a soma, entre as fontes, da maior pontuação de cada fonte, de forma que
+    tendências vistas em várias fontes sobem no ranking sem que repetições de uma mesma
+    fonte inflem o valor.
+    """
+    name_counts = Counter(record['name'] for record in records)
+    best = max(records, key=lambda r: r.get('score') or 0)
+    name = max(records, key=lambda r: (
+        not r['name'].lstrip().startswith('#'), name_counts[r['name']], r.get('score') or 0, -len(r['name'])
+    ))['name']
+    if name.lstrip().startswith('#'):
+        name = ' '.join(_CAMEL_CASE.sub(' ', name.replace('#', ' ')).split())
+    source_scores = defaultdict(float)
+    for record in records:
+        source = record.get('source') or ''
+        source_scores[source] = max(source_scores[source], float(record.get('score') or 0))
+    sources = sorted(source for source in source_scores if source)
+    return {
+        **best,
+        'name': name,
+        'region': best['region'].upper(),
+        'score': sum(source_scores.values()),
+        'source': ','.join(sources) or best.get('source'),
+        'sources': sources,
+        'source_scores': {source: score for source, score in source_scores.items() if source},
+        'aliases': sorted(name_counts),
+        'normalized_name': trend_key(name),
+    }
+
+
+def cluster_trends(records: Iterable[dict], similarity: Optional[float] = None) -> List[dict]:
+    """
+    Agrupa, por região, os registros de tendência que descrevem a mesma tendência e
+    devolve um registro combinado por grupo, na ordem em que cada grupo apareceu.
+    Registros sem nome ou região são devolvidos sem alteração para que o TrendProcessor
+    os rejeite.
+
+    :param similarity: Jaccard mínimo dos trigramas para unir chaves diferentes
+        (padrão: TREND_DEDUP_SIMILARITY). Use 1.0 para agrupar apenas chaves idênticas.
+    """
+    similarity = settings.TREND_DEDUP_SIMILARITY if similarity is None else similarity
+    hasher = MinHasher(settings.TREND_DEDUP_MINHASH_PERMUTATIONS)
+
+    passthrough = []
+    by_region: Dict[str, Dict[str, List[Tuple[int, dict]]]] = defaultdict(lambda: defaultdict(list))
+    for position, record in enumerate(records):
+        name, region = record.get('name'), record.get('region')
+        key = trend_key(name) if name else ''
+        if not key or not region:
+            passthrough.append((position, record))
+            continue
+        by_region[region.upper()][key].append((position, record))
+
+    merged = list(passthrough)
+    for region_keys in by_region.values():
+        keys = list(region_keys)
+        if similarity < 1.0 and len(keys) > 1:
+            clusters = _cluster_keys(keys, similarity, hasher, settings.TREND_DEDUP_LSH_BANDS)
+        else:
+            clusters = _DisjointSet(len(keys))
+        groups = defaultdict(list)
+        for index, key in enumerate(keys):
+            groups[clusters.find(index)].extend(region_keys[key])
+        for members in groups.values():
+            first_position = min(position for position, _ in members)
+            merged.append((first_position, _merge_cluster([record for _, record in members])))
+
+    merged.sort(key=lambda item: item[0])
+    return [record for _, record in merged]
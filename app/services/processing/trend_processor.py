@@ -1,7 +1,19 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+from celery import group
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.crud import crud_trends
+from app.services.collectors.base_collector import batched
+from app.services.tasks import enrich_trend
 from app.schemas import trend as trend_schema
 from .category_mapper import get_mapped_category_slug
+from .trend_normalizer import cluster_trends, trend_key
+from .trend_scorer import TrendScorer, as_utc
+
+def _enriched_since(enriched_at: Optional[datetime], cutoff: datetime) -> bool:
+    return enriched_at is not None and as_utc(enriched_at) >= cutoff
 
 class TrendProcessor:
     """
@@ -10,17 +22,33 @@ class TrendProcessor:
     def __init__(self, db_session: Session):
         self.db = db_session
 
-    def process(self, trend_data: list[dict]):
+    def process(self, trend_data: list[dict], refresh_rankings: bool = True):
         """
-        Processa uma lista de dados de tendências. 
-        FORÇARÁ O ENRIQUECIMENTO de todas as tendências encontradas.
+        Processa uma lista de dados de tendências em lote: agrupa as variações de uma
+        mesma tendência (ver trend_normalizer), faz uma única consulta para as
+        tendências existentes, um único INSERT para as novas e um único grupo Celery
+        de enriquecimento. Tendências enriquecidas dentro da janela
+        TREND_ENRICHMENT_WINDOW_HOURS não são enfileiradas de novo.
+
+        As pontuações das fontes viram observações no TrendScorer e, com
+        `refresh_rankings`, o top-N das regiões/categorias do lote é recalculado ao final.
+
+        :return: Os pares (região, categoria) das tendências pontuadas.
         """
         if not trend_data or not isinstance(trend_data, list):
             print("Dados de tendência inválidos ou vazios.")
-            return
+            return set()
 
-        print(f"Processando {len(trend_data)} tendências com enriquecimento forçado...")
-        trends_criadas = 0
+        print(f"Processando {len(trend_data)} tendências...")
+
+        # 1. Agrupa variações da mesma tendência (maiúsculas, acentos, hashtags, ordem das palavras)
+        if settings.TREND_DEDUP_ENABLED:
+            trend_data = cluster_trends(trend_data)
+
+        # 2. Valida e deduplica pela chave normalizada dentro do lote
+        trends_in = {}
+        source_scores = defaultdict(dict)  # chave do grupo -> {fonte: pontuação}
+        aliases = {}  # (nome, região) de cada variação -> chave do grupo
         for item in trend_data:
             trend_name = item.get('name')
             region = item.get('region')
@@ -37,34 +65,101 @@ class TrendProcessor:
                     print(f"Item de tendência inválido ignorado: {item}")
                 continue
 
-            score = item.get('score', 0)
-
-            # Tenta buscar a tendência no banco
-            db_trend = crud_trends.get_trend_by_name_and_region(
-                self.db, name=trend_name, region=region
+            region = region.upper()
+            key = (item.get('normalized_name') or trend_key(trend_name), region)
+            for alias in item.get('aliases') or [trend_name]:
+                aliases.setdefault((alias, region), key)
+            for item_source, item_score in (item.get('source_scores') or {source: item.get('score')}).items():
+                source_scores[key][item_source] = max(source_scores[key].get(item_source) or 0, item_score or 0)
+            if key in trends_in:
+                continue
+            # A pontuação é mantida pelo TrendScorer a partir das observações
+            trends_in[key] = trend_schema.TrendCreate(
+                name=trend_name,
+                normalized_name=key[0],
+                region=region,
+                source=source,
+                category=mapped_slug, # Usa o slug mapeado
+                description=f"Tendência coletada da fonte: {source}."
             )
 
-            # Se não existir, cria uma nova
-            if not db_trend:
-                trend_in = trend_schema.TrendCreate(
-                    name=trend_name,
-                    score=score,
-                    region=region,
-                    source=source,
-                    category=mapped_slug, # Usa o slug mapeado
-                    description=f"Tendência coletada da fonte: {source}."
-                )
-                db_trend = crud_trends.create_trend(self.db, trend=trend_in)
-                trends_criadas += 1
-            
-            # Garante que temos um objeto de tendência (novo ou existente)
-            # e despacha a tarefa de enriquecimento para ele.
-            if db_trend:
-                from app.services.tasks import enrich_trend
-                print(f"Disparando enriquecimento para Trend ID: {db_trend.id} ({db_trend.name})")
-                enrich_trend.delay(db_trend.id)
-        
-        if trends_criadas > 0:
-            print(f"{trends_criadas} novas tendências foram salvas.")
-        else:
-            print("Nenhuma tendência nova foi criada (mas o enriquecimento foi disparado para as existentes).")
\ No newline at end of file
+        if not trends_in:
+            return set()
+
+        # 3. Busca as existentes (por qualquer variação) e insere as novas, cada etapa em uma única query
+        db_trends = self._find_existing(trends_in, aliases)
+        new_keys = [key for key in trends_in if key not in db_trends]
+        trends_criadas = crud_trends.create_trends_bulk(self.db, [trends_in[key] for key in new_keys])
+        if new_keys:
+            # Recarrega todas de uma vez: o commit do INSERT expirou as já carregadas
+            db_trends = self._find_existing(trends_in, aliases)
+
+        # 4. Seleciona as que precisam de enriquecimento, pulando as enriquecidas recentemente
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(hours=settings.TREND_ENRICHMENT_WINDOW_HOURS)
+        candidate_ids = {
+            db_trend.id for db_trend in db_trends.values()
+            if not _enriched_since(db_trend.enriched_at, cutoff)
+        }
+        observations = [
+            {'trend_id': db_trend.id, 'source': source, 'score': score}
+            for key, db_trend in db_trends.items()
+            for source, score in source_scores[key].items()
+        ]
+
+        # 5. Registra as observações de pontuação e atualiza os rankings
+        scorer = TrendScorer(self.db)
+        touched = scorer.record(observations, now=now)
+        if refresh_rankings:
+            scorer.refresh_rankings(touched, now=now)
+
+        # 6. Reivindica as tendências (enrichment_requested_at) e enfileira o enriquecimento de uma vez.
+        # Uma tendência já enfileirada por outra ingestão, ainda não enriquecida, não é despachada de novo
+        trend_ids = crud_trends.claim_trends_for_enrichment(self.db, candidate_ids, cutoff=cutoff, now=now)
+        if trend_ids:
+            group(enrich_trend.s(trend_id) for trend_id in trend_ids).apply_async()
+
+        print(
+            f"{trends_criadas} novas tendências salvas; enriquecimento disparado para {len(trend_ids)} "
+            f"({len(db_trends) - len(trend_ids)} enriquecidas ou enfileiradas recentemente)."
+        )
+        return touched
+
+    def _find_existing(self, trends_in: dict, aliases: dict) -> dict:
+        """
+        Carrega as tendências já salvas que correspondem às chaves normalizadas de
+        `trends_in` ou a qualquer uma das variações em `aliases`.
+
+        :return: {(chave normalizada, região): Trend}
+        """
+        keys = {key: key for key in trends_in}
+        names = {(trend.name, key[1]): key for key, trend in trends_in.items()}
+        for (alias, region), key in aliases.items():
+            keys.setdefault((trend_key(alias), region), key)
+            names.setdefault((alias, region), key)
+
+        found = {}
+        for db_trend in crud_trends.get_trends_by_normalized_name(self.db, list(keys), list(names)):
+            key = keys.get((db_trend.normalized_name, db_trend.region)) or names.get((db_trend.name, db_trend.region))
+            if key:
+                found.setdefault(key, db_trend)
+        return found
+
+    def process_stream(self, records: Iterable[dict], batch_size: int = None) -> int:
+        """
+        Consome um iterável de registros (ex: BaseCollector.iter_collect) em lotes de
+        `batch_size`, chamando `process` para cada lote. O uso de memória fica limitado
+        ao tamanho do lote, qualquer que seja o tamanho da entrada.
+
+        :return: O número de registros processados.
+        """
+        batch_size = batch_size or settings.TREND_PROCESSOR_BATCH_SIZE
+        total = 0
+        touched = set()
+        for batch in batched(records, batch_size):
+            # Os rankings são recalculados uma única vez, ao final da ingestão
+            touched |= self.process(batch, refresh_rankings=False)
+            total += len(batch)
+        if touched:
+            TrendScorer(self.db).refresh_rankings(touched)
+        return total
@@ -0,0 +1,165 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.core.cache import api_cache, trends_version_name
+from app.core.config import settings
+from app.crud import crud_trend_scores
+from app.crud.crud_trend_scores import ALL_CATEGORIES
+
+"""
+Pontuação das tendências com decaimento no tempo.
+
+Cada coleta grava uma observação por (tendência, fonte) em 'trend_observations' e
+atualiza de forma incremental a pontuação agregada da tendência, uma soma das
+observações com decaimento exponencial (meia-vida TREND_SCORE_HALF_LIFE_HOURS):
+
+    score(t) = score(t0) * 0.5 ** ((t - t0) / meia_vida) + observações(t)
+
+Tendências vistas com frequência e por várias fontes sobem; as que param de aparecer
+perdem metade da pontuação a cada meia-vida. Como o decaimento é o mesmo para todas,
+a ordem relativa não depende do instante: cada tendência guarda a chave
+
+    score_rank_key = log2(score(t0)) + (t0 - RANK_KEY_EPOCH) / meia_vida
+
+e score(t) = 2 ** (score_rank_key - (t - RANK_KEY_EPOCH) / meia_vida) para qualquer t.
+O top-N de uma região/categoria é um ORDER BY score_rank_key DESC LIMIT N no índice,
+recalculado após cada ingestão só para os pares afetados e gravado em
+'trend_rankings'; a leitura do ranking é uma consulta pela chave primária.
+
+Ao mudar TREND_SCORE_HALF_LIFE_HOURS, as chaves gravadas precisam ser recalculadas
+com TrendScorer.rebuild_rank_keys.
+"""
+
+# Referência fixa das chaves de ordenação
+RANK_KEY_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+RankingKey = Tuple[str, Optional[str]]
+
+
+def as_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """O SQLite devolve datetimes sem fuso; os valores gravados estão em UTC."""
+    if moment is not None and moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def decayed_score(score: Optional[float], updated_at: Optional[datetime], now: datetime) -> float:
+    """Pontuação `score`, válida em `updated_at`, trazida para `now`."""
+    if not score or updated_at is None:
+        return 0.0
+    elapsed_hours = max(0.0, (now - as_utc(updated_at)).total_seconds() / 3600)
+    return score * 0.5 ** (elapsed_hours / settings.TREND_SCORE_HALF_LIFE_HOURS)
+
+
+def rank_key(score: Optional[float], updated_at: Optional[datetime]) -> Optional[float]:
+    """Chave de ordenação independente do instante (ver o docstring do módulo)."""
+    if not score or score <= 0 or updated_at is None:
+        return None
+    hours = (as_utc(updated_at) - RANK_KEY_EPOCH).total_seconds() / 3600
+    return math.log2(score) + hours / settings.TREND_SCORE_HALF_LIFE_HOURS
+
+
+def observation_value(source: str, score: Optional[float]) -> float:
+    """Valor de uma observação: a pontuação da fonte (ou o valor padrão) vezes o peso da fonte."""
+    value = float(score) if score else settings.TREND_SCORE_DEFAULT_OBSERVATION
+    return value * settings.TREND_SCORE_SOURCE_WEIGHTS.get(source, 1.0)
+
+
+class TrendScorer:
+    """
+    Registra observações, atualiza as pontuações agregadas e recalcula os rankings.
+    """
+    def __init__(self, db_session: Session):
+        self.db = db_session
+
+    def record(self, observations: Iterable[dict], now: datetime = None) -> Set[RankingKey]:
+        """
+        Grava as observações e soma seus valores à pontuação decaída de cada tendência,
+        em uma transação.
+
+        :param observations: [{'trend_id', 'source', 'score'}]
+        :return: Os pares (região, categoria) das tendências atualizadas, para refresh_rankings.
+        """
+        now = now or datetime.now(timezone.utc)
+        rows = []
+        totals = defaultdict(float)
+        for observation in observations:
+            value = observation_value(observation['source'], observation.get('score'))
+            totals[observation['trend_id']] += value
+            rows.append({
+                'trend_id': observation['trend_id'],
+                'source': observation['source'],
+                'score': value,
+                'observed_at': now,
+            })
+        if not rows:
+            return set()
+
+        scores = []
+        touched = set()
+        for trend in crud_trend_scores.get_trends_for_scoring(self.db, list(totals)):
+            new_score = decayed_score(trend.score, trend.score_updated_at, now) + totals[trend.id]
+            scores.append({
+                'trend_id': trend.id,
+                'new_score': new_score,
+                'new_score_updated_at': now,
+                'new_score_rank_key': rank_key(new_score, now),
+            })
+            touched.add((trend.region, trend.category))
+        crud_trend_scores.save_trend_scores(self.db, rows, scores)
+        return touched
+
+    def refresh_rankings(self, keys: Iterable[RankingKey], size: int = None, now: datetime = None) -> Dict[RankingKey, int]:
+        """
+        Recalcula o top-N das categorias em `keys` e o geral (ALL_CATEGORIES) de suas
+        regiões. Cada top-N é lido já ordenado e limitado pelo banco.
+
+        :param keys: Pares (região, categoria), como os devolvidos por record.
+        :return: {(região, categoria): número de linhas gravadas no ranking}
+        """
+        size = size or settings.TREND_RANKING_SIZE
+        now = now or datetime.now(timezone.utc)
+        pairs = set()
+        for region, category in keys:
+            pairs.add((region.upper(), ALL_CATEGORIES))
+            if category:
+                pairs.add((region.upper(), category))
+
+        rankings = {}
+        for region, category in sorted(pairs):
+            top = crud_trend_scores.get_top_trends(
+                self.db, region, None if category == ALL_CATEGORIES else category, size
+            )
+            rankings[(region, category)] = [
+                {
+                    'region': region,
+                    'category': category,
+                    'rank': rank,
+                    'trend_id': trend_id,
+                    'score': decayed_score(score, updated_at, now),
+                    'refreshed_at': now,
+                }
+                for rank, (trend_id, score, updated_at) in enumerate(top, start=1)
+            ]
+        if rankings:
+            crud_trend_scores.replace_trend_rankings(self.db, rankings)
+            api_cache.bump_version(trends_version_name())
+        return {key: len(rows) for key, rows in rankings.items()}
+
+    def rebuild_rank_keys(self, regions: Iterable[str]) -> int:
+        """
+        Recalcula score_rank_key das tendências pontuadas das regiões (após mudar a
+        meia-vida ou para preencher tendências pontuadas antes da chave existir).
+
+        :return: O número de tendências atualizadas.
+        """
+        keys = []
+        for region in sorted({region.upper() for region in regions}):
+            keys.extend(
+                {'trend_id': trend_id, 'new_score_rank_key': rank_key(score, updated_at)}
+                for trend_id, _, score, updated_at in crud_trend_scores.get_trend_score_states(self.db, region)
+            )
+        crud_trend_scores.save_trend_rank_keys(self.db, keys)
+        return len(keys)
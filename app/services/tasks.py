@@ -1,105 +1,88 @@
-import requests
-import json
+import asyncio
+import atexit
+import os
+import time
+from typing import Awaitable, Callable, List
+from celery import chord, group
+from app.core.cache import api_cache, catalog_version_name, response_cache, trends_version_name
 from app.core.config import settings
 from app.core.celery_app import celery_app
+from app.core.rate_limit import ProviderUnavailableError, RateLimitedError, backoff_delay
+from app.database import models, pool
 from app.database.session import SessionLocal
 from app.crud import crud_trends as crud_catalog
 from app.schemas import trend as catalog_schema
+from app.services.fingerprints import content_fingerprint, listing_fingerprint
+from app.services.hasdata_client import HasdataClient
+from app.services.processing.product_enricher import ProductEnricher
 
-# I'm keeping the service and tasks in the same file for now.
-# In a real-world scenario, hasdata_service would be in its own file.
+# Provider errors that are worth retrying later instead of dropping the data
+RETRYABLE_ERRORS = (RateLimitedError, ProviderUnavailableError)
 
-HASDATA_API_URL = "https://api.hasdata.com/scrape/google"
 
-# Mapping for region-specific parameters for the Hasdata API
-REGION_PARAMS = {
-    "BR": {"location": "Brazil", "gl": "br", "hl": "pt-br"},
-    "US": {"location": "United States", "gl": "us", "hl": "en"},
-    "EU": {"location": "Germany", "gl": "de", "hl": "de"}, # Using Germany as a proxy for EU
-}
+# One event loop and one HasdataClient per worker process, so the sync tasks reuse the
+# client's keep-alive connections instead of opening a new pool on every call: (pid, loop, client)
+_hasdata = None
 
-def get_shopping_results(query: str, region: str = "BR") -> dict:
-    """
-    Calls the Hasdata Google Shopping API for a specific region.
-    """
-    if not settings.HASDATA_API_KEY:
-        print("Error: HASDATA_API_KEY not configured.")
-        return {}
-
-    region_upper = region.upper()
-    if region_upper not in REGION_PARAMS:
-        print(f"Error: Region '{region}' not supported.")
-        return {}
-
-    url = f"{HASDATA_API_URL}/shopping"
-    params = {
-        "q": query,
-        "deviceType": "desktop",
-        **REGION_PARAMS[region_upper]
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "x-api-key": settings.HASDATA_API_KEY,
-    }
+def _run_hasdata(call: Callable[[HasdataClient], Awaitable]):
+    """Runs `call(client)` on this process's event loop with its shared HasdataClient."""
+    global _hasdata
+    # A forked worker must not reuse the parent's loop and sockets
+    if _hasdata is None or _hasdata[0] != os.getpid():
+        loop = asyncio.new_event_loop()
+        client = loop.run_until_complete(HasdataClient().__aenter__())
+        _hasdata = (os.getpid(), loop, client)
+    _, loop, client = _hasdata
+    return loop.run_until_complete(call(client))
 
-    try:
-        print(f"Calling Hasdata Shopping API for query='{query}' in region='{region_upper}'")
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling Hasdata Shopping API: {e}")
-        return {}
+@atexit.register
+def _close_hasdata():
+    if _hasdata is not None and _hasdata[0] == os.getpid():
+        _, loop, client = _hasdata
+        loop.run_until_complete(client.__aexit__(None, None, None))
+        loop.close()
+
+def _fetch_many_immersive_details(page_tokens: List[str]) -> List[dict]:
+    return _run_hasdata(lambda client: client.get_many_immersive_details(page_tokens, return_exceptions=True))
 
-def get_immersive_details(page_token: str) -> dict:
+def _retry(task, exc: Exception, **options):
     """
-    Calls the Hasdata Google Immersive Product API.
+    Reschedules a bound task with exponential backoff and jitter, honoring the
+    provider's Retry-After. Raises Celery's Retry (or exc once retries run out).
     """
-    if not settings.HASDATA_API_KEY:
-        print("Error: HASDATA_API_KEY not configured.")
-        return {}
-
-    url = f"{HASDATA_API_URL}/immersive-product"
-    params = {"pageToken": page_token}
-    headers = {
-        "Content-Type": "application/json",
-        "x-api-key": settings.HASDATA_API_KEY,
-    }
+    countdown = backoff_delay(task.request.retries, retry_after=getattr(exc, "retry_after", None))
+    print(
+        f"{exc}. Retrying {task.name} in {countdown:.1f}s "
+        f"(attempt {task.request.retries + 1}/{settings.RETRY_MAX_ATTEMPTS})."
+    )
+    raise task.retry(exc=exc, countdown=countdown, max_retries=settings.RETRY_MAX_ATTEMPTS, **options)
 
-    try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling Hasdata Immersive Product API: {e}")
-        return {}
+def get_shopping_results(query: str, region: str = "BR") -> dict:
+    """
+    Calls the Hasdata Google Shopping API for a specific region.
+    Raises RateLimitedError / ProviderUnavailableError on retryable failures.
+    """
+    return _run_hasdata(lambda client: client.get_shopping_results(query=query, region=region))
 
 
-@celery_app.task(acks_late=True)
-def fetch_and_save_product_details(product_data: dict, search_query_id: int, region: str):
+def build_product(product_data: dict, details: dict, search_query_id: int, region: str):
     """
-    Sub-task to fetch immersive details for a single product and save it.
+    Builds a ProductCreate from a shopping result and its immersive details.
+    Returns None when the required fields are missing.
     """
-    print(f"Fetching details for product: {product_data.get('title')}")
-    page_token = product_data.get("immersiveProductPageToken")
-    if not page_token:
-        return
-
-    details = get_immersive_details(page_token=page_token)
     product_results = details.get("productResults")
-
     if not product_results:
-        return
+        return None
 
     store_info = product_results.get("stores", [])[0] if product_results.get("stores") else {}
     if not store_info:
-        return
+        return None
 
     # Ensure the product has the required fields
     if not (product_data.get("productId") and store_info.get("link")):
-        return
+        return None
 
-    product_to_save = catalog_schema.ProductCreate(
+    product = catalog_schema.ProductCreate(
         google_product_id=product_data.get("productId"),
         search_query_id=search_query_id,
         region=region.upper(),
@@ -116,12 +99,208 @@ def fetch_and_save_product_details(product_data: dict, search_query_id: int, reg
             "price_range": product_results.get("priceRange"),
             "details_and_offers": store_info.get("detailsAndOffers"),
         },
+        listing_fingerprint=listing_fingerprint(product_data),
     )
+    product.content_fingerprint = content_fingerprint(product)
+    return product
+
+
+def _sync_product_details(products: List[dict], search_query_id: int, region: str, stats: dict, search_filters: dict = None):
+    """
+    Fetches immersive details for the products in batches of CATALOG_SYNC_DETAILS_BATCH_SIZE,
+    each batch concurrently, and saves every batch in a single transaction.
+    search_filters ({search_query_id: text}) comes from the filter sync of the same query.
+    Adds the counts to `stats` and returns (failed_products, errors) for the lookups
+    that hit a retryable provider error.
+    """
+    products = [p for p in products if p.get("immersiveProductPageToken")]
+    batch_size = max(settings.CATALOG_SYNC_DETAILS_BATCH_SIZE, 1)
+    failed_products = []
+    retry_errors = []
+
+    for start in range(0, len(products), batch_size):
+        batch = products[start:start + batch_size]
+        started = time.perf_counter()
+        details = _fetch_many_immersive_details([p["immersiveProductPageToken"] for p in batch])
+        fetched = time.perf_counter()
+
+        products_to_save = []
+        batch_failed = 0
+        for product_data, product_details in zip(batch, details):
+            if isinstance(product_details, RETRYABLE_ERRORS):
+                failed_products.append(product_data)
+                retry_errors.append(product_details)
+                batch_failed += 1
+                continue
+            if isinstance(product_details, Exception):
+                raise product_details
+            product_to_save = build_product(product_data, product_details, search_query_id=search_query_id, region=region)
+            if product_to_save:
+                products_to_save.append(product_to_save)
 
+        db = SessionLocal()
+        try:
+            counts = crud_catalog.bulk_upsert_products(db, products=products_to_save, search_filters=search_filters)
+        finally:
+            db.close()
+        saved = time.perf_counter()
+
+        skipped = len(batch) - len(products_to_save) - batch_failed
+        stats["products_fetched"] += len(batch) - batch_failed
+        stats["products_inserted"] += counts["inserted"]
+        stats["products_updated"] += counts["updated"]
+        stats["products_unchanged"] += counts["unchanged"]
+        stats["products_skipped"] += skipped
+        print(
+            f"Batch of {len(batch)} products for query {search_query_id}: "
+            f"{counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged, "
+            f"{skipped} skipped, {batch_failed} failed "
+            f"(fetch {fetched - started:.2f}s, save {saved - fetched:.2f}s)"
+        )
+
+    return failed_products, retry_errors
+
+
+def _empty_sync_stats() -> dict:
+    stats = {counter: 0 for counter in crud_catalog.SYNC_RUN_COUNTERS}
+    stats["failures"] = []
+    return stats
+
+
+def _longest_retry(errors: List[Exception]) -> Exception:
+    """Picks the error with the longest Retry-After the provider asked for."""
+    return max(errors, key=lambda e: getattr(e, "retry_after", None) or 0)
+
+
+@celery_app.task(bind=True, acks_late=True)
+def sync_search_queries(self, region: str, query_ids: List[int], pending_products: dict = None, stats: dict = None):
+    """
+    Syncs a batch of search queries: shopping results, filters and product details.
+    Returns the counters for the completion step of the regional sync.
+
+    Queries whose shopping call and products whose details hit a retryable provider error
+    are retried with backoff (pending_products maps query id -> products). Once retries run
+    out they are recorded as failures instead of failing the whole sync.
+    """
+    stats = stats or _empty_sync_stats()
+    retry_query_ids = []
+    retry_products = {}
+    retry_errors = []
     db = SessionLocal()
     try:
-        crud_catalog.create_or_update_product(db, product=product_to_save)
-        print(f"Saved product: {product_to_save.title}")
+        search_queries = [crud_catalog.get_search_query(db, query_id) for query_id in query_ids]
+        for sq in filter(None, search_queries):
+            print(f"Processing query: '{sq.query}'")
+            try:
+                shopping_results = get_shopping_results(query=sq.query, region=sq.region)
+            except RETRYABLE_ERRORS as e:
+                print(f"Could not fetch results for query '{sq.query}': {e}")
+                retry_query_ids.append(sq.id)
+                retry_errors.append(e)
+                continue
+            stats["queries_synced"] += 1
+
+            if not shopping_results:
+                print(f"No results for query: '{sq.query}'")
+                continue
+
+            # --- Filter Extraction ---
+            filters_data = shopping_results.get("filters", [])
+            filter_options = [
+                (filter_option.get("text"), filter_group.get("title"))
+                for filter_group in filters_data
+                for filter_option in filter_group.get("options", [])
+            ]
+            filter_counts = crud_catalog.bulk_sync_filters(
+                db, search_query_id=sq.id, filters=filter_options, prune=settings.CATALOG_SYNC_PRUNE_FILTERS
+            )
+            print(f"Extracted and saved {filter_counts['written']} filters for '{sq.query}' ({filter_counts['pruned']} pruned).")
+
+            # --- Product Fetching ---
+            products = shopping_results.get("shoppingResults", [])
+            if settings.CATALOG_SYNC_SKIP_UNCHANGED:
+                # Products whose shopping result hasn't changed since the last sync don't need new details
+                stored_fingerprints = crud_catalog.get_listing_fingerprints(
+                    db, [p.get("productId") for p in products if p.get("productId")]
+                )
+                changed = [
+                    p for p in products
+                    if stored_fingerprints.get(p.get("productId")) != listing_fingerprint(p)
+                ]
+                stats["products_unchanged"] += len(products) - len(changed)
+                print(f"Skipping {len(products) - len(changed)} unchanged products for '{sq.query}'.")
+                products = changed
+            print(f"Found {len(products)} products for '{sq.query}'. Fetching details...")
+            failed, errors = _sync_product_details(
+                products, sq.id, sq.region, stats, search_filters={sq.id: filter_counts["search_filters"]}
+            )
+            if failed:
+                retry_products[str(sq.id)] = failed
+                retry_errors.extend(errors)
+
+        for query_id, products in (pending_products or {}).items():
+            failed, errors = _sync_product_details(products, int(query_id), region, stats)
+            if failed:
+                retry_products[query_id] = failed
+                retry_errors.extend(errors)
+    finally:
+        db.close()
+
+    if retry_query_ids or retry_products:
+        if self.request.retries < settings.RETRY_MAX_ATTEMPTS:
+            _retry(self, _longest_retry(retry_errors), kwargs={
+                "region": region,
+                "query_ids": retry_query_ids,
+                "pending_products": retry_products,
+                "stats": stats,
+            })
+        error = str(_longest_retry(retry_errors))
+        stats["queries_failed"] += len(retry_query_ids)
+        stats["products_failed"] += sum(len(products) for products in retry_products.values())
+        stats["failures"].extend({"query_id": query_id, "error": error} for query_id in retry_query_ids)
+        stats["failures"].extend(
+            {"query_id": int(query_id), "products": len(products), "error": error}
+            for query_id, products in retry_products.items()
+        )
+    return stats
+
+
+@celery_app.task(acks_late=True)
+def finalize_catalog_sync(results: List[dict], sync_run_id: int, region: str):
+    """
+    Completion step of a regional sync (chord callback): aggregates the counters of every
+    query batch, records them in sync_runs and invalidates the cached catalog API responses.
+    """
+    totals = _empty_sync_stats()
+    for result in results:
+        for key, value in result.items():
+            totals[key] += value
+
+    failures = totals.pop("failures")
+    status = "completed_with_errors" if failures else "completed"
+    db = SessionLocal()
+    try:
+        sync_run = crud_catalog.finish_sync_run(db, sync_run_id, status=status, counts=totals, failures=failures)
+    finally:
+        db.close()
+
+    # Invalidates the cached catalog API responses of this region
+    api_cache.bump_version(catalog_version_name(region))
+    duration = f"{sync_run.duration_seconds:.1f}s" if sync_run and sync_run.duration_seconds is not None else "n/a"
+    print(f"Sync run {sync_run_id} for region {region.upper()} {status} in {duration}: {totals}")
+    print(f"Response cache stats: {response_cache.stats()}")
+    print(f"Database pool stats: {pool.stats()}")
+    print(f"--- Product Catalog Sync Finished for region: {region.upper()} ---")
+    return {"sync_run_id": sync_run_id, "status": status, **totals}
+
+
+@celery_app.task
+def mark_catalog_sync_failed(request, exc, traceback, sync_run_id: int, region: str):
+    """Error callback of a regional sync: a query batch raised an unexpected error."""
+    print(f"Sync run {sync_run_id} for region {region.upper()} failed: {exc!r}")
+    db = SessionLocal()
+    try:
+        crud_catalog.finish_sync_run(db, sync_run_id, status="failed", counts={}, failures=[{"error": repr(exc)}])
     finally:
         db.close()
 
@@ -130,37 +309,73 @@ def fetch_and_save_product_details(product_data: dict, search_query_id: int, reg
 def run_product_catalog_sync(region: str):
     """
     Main task to sync the product catalog from Hasdata for a specific region.
+
+    Creates a sync_runs row and fans the active queries out as a chord: a group of
+    sync_search_queries tasks (CATALOG_SYNC_QUERIES_PER_TASK queries each) running in
+    parallel, followed by finalize_catalog_sync once all of them are done.
     """
     print(f"--- Starting Product Catalog Sync for region: {region.upper()} ---")
     db = SessionLocal()
     try:
         search_queries = crud_catalog.get_active_search_queries_by_region(db, region=region)
-        print(f"Found {len(search_queries)} active search queries for region {region.upper()}.")
+        query_ids = [sq.id for sq in search_queries]
+        sync_run = crud_catalog.create_sync_run(db, region=region, queries_total=len(query_ids))
+        sync_run_id = sync_run.id
+    finally:
+        db.close()
+    print(f"Found {len(query_ids)} active search queries for region {region.upper()} (sync run {sync_run_id}).")
 
-        for sq in search_queries:
-            print(f"Processing query: '{sq.query}'")
-            shopping_results = get_shopping_results(query=sq.query, region=sq.region)
+    if not query_ids:
+        finalize_catalog_sync.delay([], sync_run_id=sync_run_id, region=region)
+        return sync_run_id
 
-            if not shopping_results:
-                print(f"No results for query: '{sq.query}'")
-                continue
+    per_task = max(settings.CATALOG_SYNC_QUERIES_PER_TASK, 1)
+    header = group(
+        sync_search_queries.s(region=region, query_ids=query_ids[start:start + per_task])
+        for start in range(0, len(query_ids), per_task)
+    )
+    callback = finalize_catalog_sync.s(sync_run_id=sync_run_id, region=region).on_error(
+        mark_catalog_sync_failed.s(sync_run_id=sync_run_id, region=region)
+    )
+    chord(header)(callback)
+    return sync_run_id
 
-            # --- Filter Extraction ---
-            filters_data = shopping_results.get("filters", [])
-            for filter_group in filters_data:
-                filter_type = filter_group.get("title")
-                for filter_option in filter_group.get("options", []):
-                    filter_name = filter_option.get("text")
-                    if filter_name:
-                        crud_catalog.get_or_create_filter(db, search_query_id=sq.id, name=filter_name, type=filter_type)
-            print(f"Extracted and saved filters for '{sq.query}'.")
 
-            # --- Product Fetching ---
-            products = shopping_results.get("shoppingResults", [])
-            print(f"Found {len(products)} products for '{sq.query}'. Dispatching sub-tasks...")
-            for product in products:
-                fetch_and_save_product_details.delay(product_data=product, search_query_id=sq.id, region=sq.region)
+@celery_app.task(bind=True, acks_late=True)
+def enrich_trend(self, trend_id: int):
+    """
+    Finds and saves products for a trend. Serper rate limits and outages are retried with backoff.
+    """
+    db = SessionLocal()
+    try:
+        trend = db.query(models.Trend).filter(models.Trend.id == trend_id).first()
+        if not trend:
+            print(f"Trend ID {trend_id} not found.")
+            return
+        ProductEnricher(db).enrich(trend=trend)
+        crud_catalog.mark_trend_enriched(db, trend_id=trend.id)
+        api_cache.bump_version(trends_version_name())
+    except RETRYABLE_ERRORS as e:
+        _retry(self, e)
+    finally:
+        db.close()
 
+@celery_app.task(bind=True, acks_late=True)
+def collect_google_trends(self, region: str):
+    """
+    Collects the Google Trends rising fashion queries for a region and processes them into trends.
+    Google Trends rate limits (HTTP 429) are retried with backoff.
+    """
+    # Imported here: the collector needs pytrends and the processor imports this module
+    from app.services.collectors.google_trends_collector import GoogleTrendsCollector
+    from app.services.processing.trend_processor import TrendProcessor
+
+    db = SessionLocal()
+    try:
+        total = TrendProcessor(db).process_stream(GoogleTrendsCollector().iter_collect(region=region))
+        print(f"Google Trends collection for {region.upper()}: {total} records processed.")
+        return total
+    except RETRYABLE_ERRORS as e:
+        _retry(self, e)
     finally:
         db.close()
-    print(f"--- Product Catalog Sync Finished for region: {region.upper()} ---")
\ No newline at end of file
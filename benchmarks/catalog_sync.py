@@ -0,0 +1,188 @@
+"""
+Benchmark de ponta a ponta do run_product_catalog_sync.
+
+Sobe o servidor falso da Hasdata, aponta o app para um banco SQLite temporário
+(ou para um Postgres local via --database-url), executa o sync com o Celery em
+modo eager e reporta produtos/s, round trips no banco por produto e latências
+p50/p95 por etapa.
+
+Uso:
+    PYTHONPATH=. python benchmarks/catalog_sync.py --queries 10 --products-per-query 40 --latency-ms 80
+"""
+import argparse
+import functools
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_hasdata import PAYLOAD_DIR, FakeHasdataServer
+
+STAGE_TIMINGS = defaultdict(list)
+
+
+def timed(stage: str, func):
+    """Wraps a function so each call's wall time is recorded under `stage`."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            STAGE_TIMINGS[stage].append(time.perf_counter() - started)
+    return wrapper
+
+
+def timed_async(stage: str, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            STAGE_TIMINGS[stage].append(time.perf_counter() - started)
+    return wrapper
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def configure_environment(args, server: FakeHasdataServer):
+    """Must run before the app is imported: Settings reads the environment at import time."""
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["HASDATA_API_URL"] = server.base_url
+    os.environ.setdefault("HASDATA_API_KEY", "benchmark")
+    os.environ["RESPONSE_CACHE_ENABLED"] = "true" if args.with_cache else "false"
+    # The fake server has no quota: measure the pipeline, not the provider rate limits
+    os.environ["RATE_LIMITS"] = "{}"
+    if args.batch_size:
+        os.environ["CATALOG_SYNC_DETAILS_BATCH_SIZE"] = str(args.batch_size)
+
+
+def seed_search_queries(session_factory, models, region: str, count: int) -> None:
+    db = session_factory()
+    try:
+        for index in range(count):
+            query = f"benchmark query {index}"
+            exists = db.query(models.SearchQuery).filter(
+                models.SearchQuery.query == query, models.SearchQuery.region == region
+            ).first()
+            if not exists:
+                db.add(models.SearchQuery(query=query, category="benchmark", region=region))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(args) -> dict:
+    with FakeHasdataServer(
+        products_per_query=args.products_per_query,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        payload_dir=args.payload_dir,
+    ) as server:
+        configure_environment(args, server)
+
+        from sqlalchemy import event
+        from app.core.celery_app import celery_app
+        from app.crud import crud_trends
+        from app.database import models
+        from app.database.session import SessionLocal, engine
+        from app.services import tasks
+        from app.services.hasdata_client import HasdataClient
+
+        celery_app.conf.update(task_always_eager=True, task_eager_propagates=True)
+        models.Base.metadata.create_all(bind=engine)
+        seed_search_queries(SessionLocal, models, args.region, args.queries)
+
+        db_round_trips = {"count": 0}
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count_round_trip(*_):
+            db_round_trips["count"] += 1
+
+        HasdataClient.get_shopping_results = timed_async("hasdata_shopping", HasdataClient.get_shopping_results)
+        HasdataClient.get_immersive_details = timed_async("hasdata_immersive", HasdataClient.get_immersive_details)
+        crud_trends.bulk_upsert_products = timed("db_upsert_products", crud_trends.bulk_upsert_products)
+        crud_trends.bulk_sync_filters = timed("db_sync_filters", crud_trends.bulk_sync_filters)
+
+        db = SessionLocal()
+        try:
+            products_before = db.query(models.Product).count()
+        finally:
+            db.close()
+
+        db_round_trips["count"] = 0
+        started = time.perf_counter()
+        tasks.run_product_catalog_sync(args.region)
+        elapsed = time.perf_counter() - started
+        round_trips = db_round_trips["count"]
+
+        db = SessionLocal()
+        try:
+            products_after = db.query(models.Product).count()
+        finally:
+            db.close()
+
+        products_synced = args.queries * args.products_per_query
+        return {
+            "elapsed_seconds": elapsed,
+            "products_synced": products_synced,
+            "products_created": products_after - products_before,
+            "products_per_second": products_synced / elapsed if elapsed else 0.0,
+            "db_round_trips": round_trips,
+            "db_round_trips_per_product": round_trips / products_synced if products_synced else 0.0,
+            "api_requests": dict(server.request_counts),
+            "stages": {
+                stage: {
+                    "calls": len(values),
+                    "p50_ms": statistics.median(values) * 1000,
+                    "p95_ms": percentile(values, 95) * 1000,
+                    "total_s": sum(values),
+                }
+                for stage, values in STAGE_TIMINGS.items()
+            },
+        }
+
+
+def print_report(report: dict) -> None:
+    print("\n=== Catalog sync benchmark ===")
+    print(f"Wall time:              {report['elapsed_seconds']:.2f}s")
+    print(f"Products synced:        {report['products_synced']} ({report['products_created']} new rows)")
+    print(f"Throughput:             {report['products_per_second']:.1f} products/s")
+    print(f"DB round trips:         {report['db_round_trips']} ({report['db_round_trips_per_product']:.2f} per product)")
+    print(f"API requests:           {report['api_requests']}")
+    print(f"\n{'stage':<22}{'calls':>8}{'p50 ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for stage, stats in sorted(report["stages"].items()):
+        print(f"{stage:<22}{stats['calls']:>8}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['total_s']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do sync do catálogo com uma Hasdata falsa.")
+    parser.add_argument("--region", default="BR", choices=["BR", "US", "EU"])
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--products-per-query", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=None, help="Override CATALOG_SYNC_DETAILS_BATCH_SIZE")
+    parser.add_argument("--payload-dir", default=PAYLOAD_DIR, help="Directory with recorded shopping.json/immersive_product.json")
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the Hasdata response cache enabled")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="catalog-bench-"), "bench.db")
+        args.database_url = f"sqlite:///{db_path}"
+
+    print_report(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Servidor HTTP local que imita a API da Hasdata para benchmarks.
+
+Responde a /shopping e /immersive-product reproduzindo os payloads gravados em
+benchmarks/payloads, com latência configurável. Cada consulta de shopping devolve
+`products_per_query` resultados com productId e pageToken únicos derivados da query,
+de modo que syncs repetidos atualizem os mesmos produtos.
+"""
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), "payloads")
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 makes concurrent clients wait on TCP SYN retries
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class FakeHasdataServer:
+    """
+    Usage:
+        with FakeHasdataServer(products_per_query=40, latency_ms=80) as server:
+            os.environ["HASDATA_API_URL"] = server.base_url
+    """
+    def __init__(self, products_per_query: int = 40, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 payload_dir: str = PAYLOAD_DIR, host: str = "127.0.0.1", port: int = 0):
+        with open(os.path.join(payload_dir, "shopping.json"), encoding="utf-8") as f:
+            self.shopping_payload = json.load(f)
+        with open(os.path.join(payload_dir, "immersive_product.json"), encoding="utf-8") as f:
+            self.immersive_payload = json.load(f)
+        self.products_per_query = products_per_query
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.request_counts = {"shopping": 0, "immersive-product": 0}
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _sleep(self):
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def shopping(self, params: dict) -> dict:
+        query = params.get("q", "")
+        query_key = hashlib.sha1(f"{query}|{params.get('gl', '')}".encode("utf-8")).hexdigest()[:12]
+        template = self.shopping_payload["shoppingResults"][0]
+        payload = copy.deepcopy(self.shopping_payload)
+        payload["shoppingResults"] = []
+        for position in range(self.products_per_query):
+            result = copy.deepcopy(template)
+            result["position"] = position + 1
+            result["productId"] = f"{query_key}-{position}"
+            result["immersiveProductPageToken"] = f"{query_key}-{position}-token"
+            result["title"] = f"{template['title']} #{position}"
+            payload["shoppingResults"].append(result)
+        return payload
+
+    def immersive_product(self, params: dict) -> dict:
+        token = params.get("pageToken", "")
+        payload = copy.deepcopy(self.immersive_payload)
+        product = payload["productResults"]
+        product["title"] = f"{product['title']} ({token})"
+        for store in product.get("stores", []):
+            store["link"] = f"{store['link']}?ref={token}"
+        return payload
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+                if endpoint == "shopping":
+                    payload = server.shopping(params)
+                elif endpoint == "immersive-product":
+                    payload = server.immersive_product(params)
+                else:
+                    self.send_error(404)
+                    return
+
+                with server._lock:
+                    server.request_counts[endpoint] += 1
+                server._sleep()
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API da Hasdata.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--products-per-query", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with FakeHasdataServer(args.products_per_query, args.latency_ms, args.jitter_ms, port=args.port) as server:
+        print(f"Fake Hasdata API listening on {server.base_url} (use it as HASDATA_API_URL)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark da limpeza de descrições do SheinCollector.
+
+Compara a implementação antiga (regex de marcas remontada e recompilada a cada linha),
+a limpeza linha a linha com o padrão pré-compilado e a API em lote
+`clean_descriptions`, reportando linhas/s e conferindo que as três produzem a mesma
+saída.
+
+Uso:
+    PYTHONPATH=. python benchmarks/shein_clean.py --lines 50000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("HASDATA_API_KEY", "benchmark")
+
+from app.services.collectors.shein_collector import DEFAULT_BRANDS_TO_REMOVE, SheinCollector
+
+WORDS = [
+    "Vestido", "midi", "floral", "com", "cinto", "Blusa", "manga", "bufante", "Calça",
+    "wide", "leg", "cintura", "alta", "Saia", "plissada", "Conjunto", "2", "peças",
+    "Top", "cropped", "canelado", "Jaqueta", "jeans", "oversized", "estampa", "xadrez",
+]
+
+
+def legacy_clean_description(description: str) -> str:
+    """Cópia da implementação anterior, que montava o padrão a cada chamada."""
+    brands_to_remove = list(DEFAULT_BRANDS_TO_REMOVE)
+    pattern = r'\b(' + '|'.join(brands_to_remove) + r')(\s*x\s*[A-Za-z]+)?\b'
+    cleaned_desc = re.sub(pattern, '', description, flags=re.IGNORECASE)
+    cleaned_desc = cleaned_desc.lstrip(' -').strip()
+    cleaned_desc = re.sub(r'\s+', ' ', cleaned_desc)
+    return cleaned_desc
+
+
+def generate_lines(count: int, seed: int) -> list:
+    """Gera linhas no formato dos dumps da Shein: marca opcional, colaboração e ruído de espaços."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        words = rng.sample(WORDS, rng.randint(3, 9))
+        if rng.random() < 0.8:
+            brand = rng.choice(DEFAULT_BRANDS_TO_REMOVE)
+            if rng.random() < 0.1:
+                brand += f" x {rng.choice(['Artist', 'Disney', 'Barbie'])}"
+            words.insert(0 if rng.random() < 0.7 else rng.randint(0, len(words)), brand)
+        prefix = rng.choice(["", " - ", "  ", "-"])
+        lines.append(prefix + "  ".join(words) + "\n")
+    return lines
+
+
+def measure(func, lines: list, repeat: int) -> tuple:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(lines)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da limpeza de descrições da Shein.")
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3, help="Keeps the best of N runs")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines, args.seed)
+    collector = SheinCollector()
+    variants = {
+        "legacy (per line, recompiled)": lambda batch: [legacy_clean_description(line) for line in batch],
+        "compiled (per line)": lambda batch: [collector._clean_description(line) for line in batch],
+        "clean_descriptions (batch)": collector.clean_descriptions,
+    }
+
+    print(f"\n=== Shein description cleanup ({args.lines} lines) ===")
+    print(f"{'variant':<32}{'seconds':>10}{'lines/s':>14}{'speedup':>10}")
+    baseline = None
+    expected = None
+    for name, func in variants.items():
+        elapsed, result = measure(func, lines, args.repeat)
+        if expected is None:
+            expected = result
+        elif result != expected:
+            mismatches = sum(1 for got, want in zip(result, expected) if got != want)
+            raise SystemExit(f"{name}: output differs from the legacy implementation on {mismatches} lines")
+        baseline = baseline or elapsed
+        print(f"{name:<32}{elapsed:>10.3f}{args.lines / elapsed:>14,.0f}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
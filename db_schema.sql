@@ -1,4 +1,7 @@
 -- Drop existing tables in reverse order of creation to handle dependencies
+DROP TABLE IF EXISTS sync_runs;
+DROP TABLE IF EXISTS trend_rankings;
+DROP TABLE IF EXISTS trend_observations;
 DROP TABLE IF EXISTS trend_products;
 DROP TABLE IF EXISTS product_categories;
 DROP TABLE IF EXISTS products;
@@ -50,14 +53,134 @@ CREATE TABLE products (
     reviews INTEGER,
     variants JSONB,
     other_details JSONB,
+    listing_fingerprint VARCHAR(64),
+    content_fingerprint VARCHAR(64),
+    -- Nomes dos filtros da busca do produto, indexados junto com o título
+    search_filters TEXT,
+    -- Busca textual: título (A), marca (B), loja e filtros (C), no idioma da região
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector(CASE region WHEN 'BR' THEN 'portuguese'::regconfig WHEN 'US' THEN 'english'::regconfig ELSE 'german'::regconfig END, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector(CASE region WHEN 'BR' THEN 'portuguese'::regconfig WHEN 'US' THEN 'english'::regconfig ELSE 'german'::regconfig END, coalesce(brand, '')), 'B') ||
+        setweight(to_tsvector(CASE region WHEN 'BR' THEN 'portuguese'::regconfig WHEN 'US' THEN 'english'::regconfig ELSE 'german'::regconfig END, coalesce(store_name, '') || ' ' || coalesce(search_filters, '')), 'C')
+    ) STORED,
     created_at TIMESTAMPTZ DEFAULT now(),
     updated_at TIMESTAMPTZ DEFAULT now()
 );
 
+-- Histórico de execuções do sync do catálogo, uma linha por região e execução.
+CREATE TABLE sync_runs (
+    id SERIAL PRIMARY KEY,
+    region region_enum NOT NULL,
+    status VARCHAR(50) NOT NULL DEFAULT 'running',
+    started_at TIMESTAMPTZ DEFAULT now(),
+    finished_at TIMESTAMPTZ,
+    duration_seconds DOUBLE PRECISION,
+    queries_total INTEGER DEFAULT 0,
+    queries_synced INTEGER DEFAULT 0,
+    queries_failed INTEGER DEFAULT 0,
+    products_fetched INTEGER DEFAULT 0,
+    products_inserted INTEGER DEFAULT 0,
+    products_updated INTEGER DEFAULT 0,
+    products_unchanged INTEGER DEFAULT 0,
+    products_skipped INTEGER DEFAULT 0,
+    products_failed INTEGER DEFAULT 0,
+    failures JSONB
+);
+
+-- Marcas conhecidas, usadas para identificar a marca pelo título dos produtos.
+CREATE TABLE brands (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) UNIQUE NOT NULL
+);
+
+-- Lojas de onde vêm os produtos das tendências.
+CREATE TABLE stores (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) UNIQUE NOT NULL,
+    logo_url TEXT
+);
+
+-- Categorias internas do sistema (populadas por scripts/seed_db.py).
+CREATE TABLE categories (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    slug VARCHAR(255) UNIQUE NOT NULL,
+    parent_id INTEGER REFERENCES categories(id)
+);
+
+-- Tendências coletadas das fontes (Shein, TikTok, Google Trends).
+CREATE TABLE trends (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    normalized_name VARCHAR(255),
+    score DOUBLE PRECISION DEFAULT 0,
+    region region_enum NOT NULL,
+    source VARCHAR(100),
+    category VARCHAR(255),
+    description TEXT,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    enriched_at TIMESTAMPTZ,
+    enrichment_requested_at TIMESTAMPTZ,
+    score_updated_at TIMESTAMPTZ,
+    score_rank_key DOUBLE PRECISION,
+    UNIQUE(name, region)
+);
+
+-- Pontuação de cada tendência por fonte, a cada coleta
+CREATE TABLE trend_observations (
+    id SERIAL PRIMARY KEY,
+    trend_id INTEGER NOT NULL REFERENCES trends(id) ON DELETE CASCADE,
+    source VARCHAR(100) NOT NULL,
+    score DOUBLE PRECISION NOT NULL,
+    observed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Top-N por região e categoria ('*' = todas), reescrito após cada ingestão
+CREATE TABLE trend_rankings (
+    region region_enum NOT NULL,
+    category VARCHAR(255) NOT NULL,
+    rank INTEGER NOT NULL,
+    trend_id INTEGER NOT NULL REFERENCES trends(id) ON DELETE CASCADE,
+    score DOUBLE PRECISION NOT NULL,
+    refreshed_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (region, category, rank)
+);
+
+CREATE TABLE trend_products (
+    trend_id INTEGER NOT NULL REFERENCES trends(id) ON DELETE CASCADE,
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    PRIMARY KEY (trend_id, product_id)
+);
+
+CREATE TABLE product_categories (
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    PRIMARY KEY (product_id, category_id)
+);
+
 -- Índices
-CREATE INDEX idx_products_region_category ON products(region, search_query_id);
+-- idx_products_region_category (region, search_query_id) e idx_products_price (price) foram
+-- substituídos pelos compostos abaixo, que cobrem os mesmos prefixos. Em bancos já criados,
+-- remova-os ao aplicar os novos:
+DROP INDEX IF EXISTS idx_products_region_category;
+DROP INDEX IF EXISTS idx_products_price;
+-- Keyset pagination: (região, categoria) ordenado por preço, e por data de atualização
+CREATE INDEX idx_products_region_query_price ON products(region, search_query_id, price, id);
+CREATE INDEX idx_products_region_price ON products(region, price, id);
+CREATE INDEX idx_products_region_updated ON products(region, updated_at DESC, id DESC);
+CREATE INDEX idx_search_queries_category_region ON search_queries(category, region);
 CREATE INDEX idx_products_brand ON products(brand);
-CREATE INDEX idx_products_price ON products(price);
+-- Busca de marca com ILIKE '%x%' usa o índice de trigramas
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_products_brand_trgm ON products USING gin (brand gin_trgm_ops);
+-- Busca textual do catálogo (crud_trends.search_products)
+CREATE INDEX idx_products_search_vector ON products USING gin (search_vector);
+-- Tendências quase duplicadas são encontradas pela chave normalizada
+CREATE INDEX idx_trends_region_normalized_name ON trends(region, normalized_name);
+-- Top-N do ranking: ORDER BY score_rank_key DESC LIMIT N por região e por região/categoria
+CREATE INDEX idx_trends_region_rank_key ON trends(region, score_rank_key DESC);
+CREATE INDEX idx_trends_region_category_rank_key ON trends(region, category, score_rank_key DESC);
+CREATE INDEX idx_trend_observations_trend_observed ON trend_observations(trend_id, observed_at);
 
 -- Inserir buscas para o Brasil (BR)
 INSERT INTO search_queries (query, category, region) VALUES
@@ -1,5 +1,7 @@
 from fastapi import FastAPI
 from app.api.endpoints import trends as catalog_router
+from app.api.endpoints import trend_rankings as trends_router
+from app.database import pool
 
 # Creates the main FastAPI application instance
 app = FastAPI(title="Trend Engine API")
@@ -7,8 +9,15 @@ app = FastAPI(title="Trend Engine API")
 # Includes the catalog router in the main application
 # All routes defined in catalog_router.router will be prefixed with /api/v1/catalog
 app.include_router(catalog_router.router, prefix="/api/v1/catalog", tags=["Catalog"])
+# Ranked trends and trend details under /api/v1/trends
+app.include_router(trends_router.router, prefix="/api/v1/trends", tags=["Trends"])
 
 @app.get("/")
 def read_root():
     """Root endpoint to check if the API is running."""
-    return {"status": "Trend Engine API is running"}
\ No newline at end of file
+    return {"status": "Trend Engine API is running"}
+
+@app.get("/metrics/db-pool")
+def read_db_pool_metrics():
+    """Connection pool usage and checkout wait times of this process."""
+    return pool.stats()
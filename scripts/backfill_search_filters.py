@@ -0,0 +1,11 @@
+from app.crud import crud_trends
+from app.database.session import SessionLocal
+
+# Preenche products.search_filters (busca textual) com os filtros atuais de cada busca.
+# Necessário para produtos salvos antes da coluna existir; os syncs seguintes a mantêm.
+db = SessionLocal()
+try:
+    count = crud_trends.refresh_search_filters(db)
+    print(f"search_filters atualizado para os produtos de {count} buscas.")
+finally:
+    db.close()
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+# Settings lê o ambiente na importação: os testes usam um SQLite temporário e
+# nenhum serviço externo (Redis indisponível cai no cache em processo)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="engine-trend-tests-"), "test.db")
+os.environ.setdefault("HASDATA_API_KEY", "test")
+os.environ["REDIS_URL"] = "redis://localhost:1/0"
+os.environ["CELERY_BROKER_URL"] = "memory://"
+os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+import pytest
+
+from app.database import models
+from app.database.session import SessionLocal, engine
+
+
+@pytest.fixture
+def db():
+    """Sessão em um banco recém-criado, apagado ao fim do teste."""
+    models.Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        models.Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,70 @@
+from sqlalchemy.dialects import postgresql
+
+from app.crud import crud_trends
+from app.database import models
+from app.schemas import trend as catalog_schema
+
+
+def make_search_query(db, query="tenis corrida"):
+    search_query = models.SearchQuery(query=query, category="calcados", region="BR")
+    db.add(search_query)
+    db.commit()
+    return search_query
+
+
+def make_product(search_query, index):
+    return catalog_schema.ProductCreate(
+        google_product_id=f"busca-{index}",
+        search_query_id=search_query.id,
+        region="BR",
+        title=f"Tenis {index}",
+        store_link=f"https://example.com/{index}",
+    )
+
+
+def stored_search_filters(db):
+    db.expire_all()
+    return {p.google_product_id: p.search_filters for p in db.query(models.Product)}
+
+
+def test_filter_sync_refreshes_search_filters_of_unchanged_products(db):
+    search_query = make_search_query(db)
+    crud_trends.bulk_upsert_products(db, [make_product(search_query, 1)])
+    assert stored_search_filters(db) == {"busca-1": None}
+
+    counts = crud_trends.bulk_sync_filters(db, search_query.id, [("Nike", "brand"), ("Azul", "color")])
+    assert counts["search_filters"] == "Nike Azul"
+    # O produto não mudou: o upsert não o reescreve, mas mantém o texto da busca
+    crud_trends.bulk_upsert_products(db, [make_product(search_query, 1)], search_filters={search_query.id: "Nike Azul"})
+    assert stored_search_filters(db) == {"busca-1": "Nike Azul"}
+
+    crud_trends.bulk_sync_filters(db, search_query.id, [("Nike", "brand")], prune=True)
+    assert stored_search_filters(db) == {"busca-1": "Nike"}
+
+
+def test_upsert_without_search_filters_keeps_stored_value(db):
+    search_query = make_search_query(db)
+    crud_trends.bulk_sync_filters(db, search_query.id, [("Nike", "brand")])
+    crud_trends.bulk_upsert_products(db, [make_product(search_query, 1)], search_filters={search_query.id: "Nike"})
+
+    changed = make_product(search_query, 1).model_copy(update={"title": "Tenis novo"})
+    crud_trends.bulk_upsert_products(db, [changed])
+    assert stored_search_filters(db) == {"busca-1": "Nike"}
+
+
+def test_refresh_search_filters_backfills_existing_products(db):
+    search_query = make_search_query(db)
+    db.add(models.Filter(search_query_id=search_query.id, name="Adidas", type="brand"))
+    db.commit()
+    crud_trends.bulk_upsert_products(db, [make_product(search_query, 1), make_product(search_query, 2)])
+
+    assert crud_trends.refresh_search_filters(db) == 1
+    assert stored_search_filters(db) == {"busca-1": "Adidas", "busca-2": "Adidas"}
+
+
+def test_search_products_query_compiles_for_postgresql():
+    sql = str(crud_trends.search_products_query("br", "tenis azul", skip=20, limit=10).compile(dialect=postgresql.dialect()))
+    assert "websearch_to_tsquery(CAST(" in sql
+    assert "AS REGCONFIG)" in sql
+    assert "products.search_vector @@ websearch_to_tsquery" in sql
+    assert "ts_rank_cd(products.search_vector" in sql
@@ -0,0 +1,21 @@
+import pytest
+
+from app.core.rate_limit import RateLimitedError
+from app.services import tasks
+
+
+def test_google_trends_rate_limit_is_retried_through_celery(db, monkeypatch):
+    pytest.importorskip("pytrends")
+    pytest.importorskip("pandas")
+    from app.services.collectors import google_trends_collector
+
+    def rate_limited(self, region="US"):
+        raise RateLimitedError("google_trends", retry_after=60)
+
+    retried = []
+    monkeypatch.setattr(google_trends_collector.GoogleTrendsCollector, "collect", rate_limited)
+    monkeypatch.setattr(tasks, "_retry", lambda task, exc, **options: retried.append(exc))
+
+    tasks.collect_google_trends.run("BR")
+
+    assert len(retried) == 1 and isinstance(retried[0], RateLimitedError)
@@ -0,0 +1,40 @@
+import httpx
+
+from app.services import hasdata_client, tasks
+from app.services.hasdata_client import HasdataClient
+
+
+def test_sync_wrappers_reuse_one_client_per_process(monkeypatch):
+    opened = []
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        params = request.url.params
+        return httpx.Response(200, json={"productResults": {"title": params.get("pageToken") or params["q"]}})
+
+    class MockedHasdataClient(HasdataClient):
+        async def __aenter__(self):
+            await super().__aenter__()
+            await self._client.aclose()
+            self._client = httpx.AsyncClient(base_url=self.base_url, transport=httpx.MockTransport(handler))
+            opened.append(self._client)
+            return self
+
+    async def no_wait(provider):
+        return None
+
+    monkeypatch.setattr(tasks, "HasdataClient", MockedHasdataClient)
+    monkeypatch.setattr(tasks, "_hasdata", None)
+    monkeypatch.setattr(hasdata_client.rate_limiter, "acquire_async", no_wait)
+    monkeypatch.setattr(hasdata_client.response_cache, "enabled", False)
+
+    assert tasks.get_shopping_results("a") == {"productResults": {"title": "a"}}
+    assert tasks.get_shopping_results("b") == {"productResults": {"title": "b"}}
+    assert tasks._fetch_many_immersive_details(["c", "d"])[1] == {"productResults": {"title": "d"}}
+
+    assert len(opened) == 1
+    assert not opened[0].is_closed
+    assert [path.rsplit("/", 1)[1] for path in requests] == ["shopping"] * 2 + ["immersive-product"] * 2
+    tasks._close_hasdata()
+    assert opened[0].is_closed
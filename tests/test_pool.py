@@ -0,0 +1,16 @@
+from app.core.config import settings
+from app.database import pool
+
+
+def test_web_process_sync_engine_uses_small_profile():
+    profile = pool.sync_pool_profile("web")
+    assert profile["name"] == "web_sync"
+    assert (profile["pool_size"], profile["max_overflow"]) == (1, 2)
+    assert pool.sync_pool_profile("worker")["name"] == "worker"
+
+
+def test_size_overrides_apply_only_to_active_profile(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_POOL_PROFILE", "web")
+    monkeypatch.setattr(settings, "DATABASE_POOL_SIZE", 20)
+    assert pool.pool_profile("web")["pool_size"] == 20
+    assert pool.pool_profile("web_sync")["pool_size"] == 1
@@ -0,0 +1,93 @@
+from app.crud import crud_stores, lookup_cache
+from app.database import models
+from app.services.processing import brand_matcher
+from app.services.processing.product_enricher import ProductEnricher, parse_price
+
+SERPER_RESULTS = [
+    {"title": "Tênis Nike Air Max", "source": "Netshoes", "link": "https://loja.example/nike-air-max",
+     "price": "R$ 1.299,90", "imageUrl": "https://img.example/1.jpg", "rating": 4.5, "ratingCount": 120,
+     "productId": "111"},
+    {"title": "Tênis Adidas Runfalcon", "source": "Centauro", "link": "https://loja.example/runfalcon",
+     "price": "R$ 349,99", "imageUrl": "https://img.example/2.jpg"},
+    # Mesmo produto listado duas vezes na resposta
+    {"title": "Tênis Nike Air Max", "source": "Netshoes", "link": "https://loja.example/nike-air-max",
+     "price": "R$ 1.299,90", "productId": "111"},
+    {"title": "Sem loja", "link": "https://loja.example/sem-loja"},
+]
+
+
+def make_trend(db, name="tenis de corrida"):
+    trend = models.Trend(name=name, region="BR", source="google", category="calcados")
+    db.add(trend)
+    db.commit()
+    return trend
+
+
+def enrich(db, trend, results):
+    lookup_cache.clear()
+    brand_matcher._matcher = None
+    enricher = ProductEnricher(db)
+    enricher._find_products = lambda query, region, limit=10: results
+    enricher.enrich(trend=trend)
+
+
+def test_enrich_saves_products_and_links_them_to_the_trend(db):
+    trend = make_trend(db)
+    enrich(db, trend, SERPER_RESULTS)
+
+    products = {p.google_product_id: p for p in db.query(models.Product)}
+    assert len(products) == 2
+    nike = products["111"]
+    assert (nike.title, nike.store_name, nike.store_link) == (
+        "Tênis Nike Air Max", "Netshoes", "https://loja.example/nike-air-max"
+    )
+    assert float(nike.price) == 1299.90
+    assert nike.brand == "Nike"
+    assert nike.reviews == 120
+    assert nike.region == "BR"
+
+    search_query = db.query(models.SearchQuery).filter(models.SearchQuery.id == nike.search_query_id).one()
+    assert (search_query.query, search_query.is_active) == ("tenis de corrida", False)
+
+    db.refresh(trend)
+    assert {p.google_product_id for p in trend.products} == set(products)
+    assert {s.name for s in db.query(models.Store)} == {"Netshoes", "Centauro"}
+
+
+def test_enrich_reuses_existing_products_and_links(db):
+    trend = make_trend(db)
+    enrich(db, trend, SERPER_RESULTS)
+    other = make_trend(db, name="nike air max")
+    enrich(db, other, SERPER_RESULTS[:1])
+    enrich(db, trend, SERPER_RESULTS)
+
+    assert db.query(models.Product).count() == 2
+    assert db.query(models.trend_products).count() == 3
+
+
+def test_ensure_stores_leaves_new_stores_in_the_callers_transaction(db):
+    crud_stores.ensure_stores(db, ["Netshoes", "Centauro", "Netshoes", None])
+    assert db.query(models.Store).count() == 2
+    db.rollback()
+    assert db.query(models.Store).count() == 0
+
+
+def test_parse_price():
+    assert parse_price("R$ 1.299,90") == 1299.90
+    assert parse_price("$49.99") == 49.99
+    assert parse_price("1,299.00 €") == 1299.00
+    assert parse_price("R$ 1.299") == 1299.0
+    assert parse_price(None) is None
+
+
+def test_brand_matcher_seed_does_not_commit_the_callers_session(db):
+    brand_matcher._matcher = None
+    # Trabalho pendente do chamador: o commit antigo em ensure_brands o gravaria junto
+    db.add(models.SearchQuery(query="pendente", category="calcados", region="BR"))
+
+    matcher = brand_matcher.get_brand_matcher(db, seed_brands=["Nike", "Farm"])
+
+    assert matcher.match_name("Vestido FARM estampado") == "Farm"
+    db.rollback()
+    assert db.query(models.SearchQuery).count() == 0
+    assert {b.name for b in db.query(models.Brand)} == {"Nike", "Farm"}
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import TokenBucketLimiter
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMITS", {"google_trends": 0.2})
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURSTS", {})
+
+
+def test_redis_bucket_uses_server_clock_and_takes_requested_tokens(limits, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # EVAL no fakeredis
+    server = fakeredis.FakeRedis()
+    limiter = TokenBucketLimiter()
+    limiter._redis = server
+    limiter._script = server.register_script(rate_limit.TOKEN_BUCKET_SCRIPT)
+    # O relógio do worker não entra no cálculo
+    monkeypatch.setattr(rate_limit.time, "time", lambda: 0.0)
+
+    assert limiter.try_acquire("google_trends", tokens=2) == 0
+    assert limiter.try_acquire("google_trends", tokens=2) == pytest.approx(10.0, abs=0.1)
+
+
+def test_local_bucket_takes_requested_tokens(limits):
+    limiter = TokenBucketLimiter()
+    limiter._redis_down_until = float("inf")
+
+    assert limiter.try_acquire("google_trends", tokens=2) == 0
+    assert limiter.try_acquire("google_trends") == pytest.approx(5.0, abs=0.1)
+
+
+def test_acquire_async_keeps_redis_off_the_event_loop(limits, monkeypatch):
+    limiter = TokenBucketLimiter()
+    threads = []
+    monkeypatch.setattr(limiter, "try_acquire", lambda provider, tokens=1: threads.append(threading.current_thread()) or 0.0)
+
+    asyncio.run(limiter.acquire_async("google_trends"))
+    assert threads and threads[0] is not threading.main_thread()
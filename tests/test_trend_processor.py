@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+
+from app.database import models
+from app.services.processing import trend_processor
+from app.services.processing.trend_processor import TrendProcessor
+
+TRENDS = [{"name": "Vestido longo", "region": "BR", "source": "google", "category": "VESTIDOS", "score": 10}]
+
+
+def dispatched_ids(monkeypatch):
+    dispatched = []
+
+    class FakeGroup:
+        def __init__(self, signatures):
+            self.ids = [signature.args[0] for signature in signatures]
+
+        def apply_async(self):
+            dispatched.append(self.ids)
+
+    monkeypatch.setattr(trend_processor, "group", FakeGroup)
+    return dispatched
+
+
+def test_trend_queued_for_enrichment_is_not_dispatched_again(db, monkeypatch):
+    dispatched = dispatched_ids(monkeypatch)
+
+    TrendProcessor(db).process(TRENDS)
+    # A tarefa ainda não rodou (enriched_at vazio): a segunda ingestão não a enfileira de novo
+    TrendProcessor(db).process(TRENDS)
+
+    trend = db.query(models.Trend).one()
+    assert dispatched == [[trend.id]]
+    assert trend.enrichment_requested_at is not None
+    assert trend.enriched_at is None
+
+
+def test_stale_enrichment_claim_is_dispatched_again(db, monkeypatch):
+    dispatched = dispatched_ids(monkeypatch)
+    TrendProcessor(db).process(TRENDS)
+
+    trend = db.query(models.Trend).one()
+    trend.enrichment_requested_at = datetime.now(timezone.utc) - timedelta(days=2)
+    db.commit()
+    TrendProcessor(db).process(TRENDS)
+
+    assert dispatched == [[trend.id], [trend.id]]
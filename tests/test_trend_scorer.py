@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+
+from app.database import models
+from app.database.session import SessionLocal
+from app.services.processing.trend_scorer import TrendScorer
+
+NOW = datetime(2026, 1, 10, 12, tzinfo=timezone.utc)
+
+
+def make_trend(db, name, score=0.0, updated_at=None, category="calcados"):
+    trend = models.Trend(
+        name=name, normalized_name=name, region="BR", source="google", category=category,
+        score=score, score_updated_at=updated_at,
+    )
+    db.add(trend)
+    db.commit()
+    return trend
+
+
+def test_record_reads_scores_committed_by_another_session(db):
+    trend = make_trend(db, "tenis", score=1.0, updated_at=NOW)
+    assert trend.score == 1.0  # a tendência fica no identity map desta sessão
+
+    other = SessionLocal()
+    try:
+        other.query(models.Trend).filter(models.Trend.id == trend.id).update({"score": 99.0})
+        other.commit()
+    finally:
+        other.close()
+
+    TrendScorer(db).record([{"trend_id": trend.id, "source": "google", "score": 10}], now=NOW)
+    db.expire_all()
+    assert db.get(models.Trend, trend.id).score == 109.0
+
+
+def test_refresh_rankings_orders_by_decayed_score_for_touched_pairs(db):
+    scorer = TrendScorer(db)
+    # 'antiga' tinha a maior pontuação, mas duas meias-vidas atrás
+    old = make_trend(db, "antiga", category="calcados")
+    scorer.record([{"trend_id": old.id, "source": "google", "score": 100}], now=NOW - timedelta(hours=48))
+    recent = make_trend(db, "recente", category="calcados")
+    other = make_trend(db, "bolsa", category="bolsas")
+    touched = scorer.record(
+        [
+            {"trend_id": recent.id, "source": "google", "score": 40},
+            {"trend_id": other.id, "source": "google", "score": 30},
+        ],
+        now=NOW,
+    )
+    assert touched == {("BR", "calcados"), ("BR", "bolsas")}
+
+    written = scorer.refresh_rankings({("BR", "calcados")}, size=2, now=NOW)
+    assert written == {("BR", "*"): 2, ("BR", "calcados"): 2}
+
+    def ranking(category):
+        rows = (
+            db.query(models.TrendRanking)
+            .filter(models.TrendRanking.category == category)
+            .order_by(models.TrendRanking.rank)
+        )
+        return [(row.trend.name, round(row.score, 6)) for row in rows]
+
+    assert ranking("calcados") == [("recente", 40.0), ("antiga", 25.0)]
+    assert ranking("*") == [("recente", 40.0), ("bolsa", 30.0)]
+    # Categorias não afetadas não são recalculadas
+    assert ranking("bolsas") == []
@@ -1,11 +1,12 @@
 # This script triggers the main data pipeline task for all supported regions.
+from celery import group
 from app.services.tasks import run_product_catalog_sync
 
 if __name__ == "__main__":
     regions = ["BR", "US", "EU"]
-    for region in regions:
-        print(f"Triggering the product catalog sync task for region: {region}...")
-        # .delay() sends the task to the Celery queue to be executed by a worker.
-        run_product_catalog_sync.delay(region)
-    
-    print("All regional tasks sent to the queue. Check the worker's terminal for progress.")
\ No newline at end of file
+    print(f"Triggering the product catalog sync task for regions: {', '.join(regions)}...")
+    # The regional syncs run in parallel. Each one fans its queries out to the workers
+    # and records its duration, counts and failures in the 'sync_runs' table when done.
+    group(run_product_catalog_sync.s(region) for region in regions).apply_async()
+
+    print("All regional tasks sent to the queue. Check the worker's terminal or the 'sync_runs' table for progress.")